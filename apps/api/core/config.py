@@ -1,7 +1,7 @@
 """Core configuration settings for the FastAPI application."""
 import os
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -19,19 +19,87 @@ class Settings(BaseSettings):
     
     # File Upload Settings
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # uploads stream to disk in chunks of this size
+    # Files of one request saved concurrently; disk writes, image checks and preprocessing share a thread pool (0 = core count)
+    UPLOAD_PARALLELISM: int = int(os.getenv("UPLOAD_PARALLELISM", "4"))
+    UPLOAD_IO_WORKERS: int = int(os.getenv("UPLOAD_IO_WORKERS", "0"))
     ALLOWED_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png"]
     UPLOAD_DIR: Path = Path("data/uploads")
     TEMP_DIR: Path = Path("data/temp")
+    # File registry (file_id -> path/hashes): memory is per-process; sqlite (WAL) or redis are shared
+    # across uvicorn workers and nodes, which must then also share TEMP_DIR
+    FILE_REGISTRY_BACKEND: str = os.getenv("FILE_REGISTRY_BACKEND", "memory")
+    FILE_REGISTRY_DB_PATH: Path = Path(os.getenv("FILE_REGISTRY_DB_PATH", "data/files.sqlite3"))
+    FILE_REGISTRY_REDIS_URL: str = os.getenv("FILE_REGISTRY_REDIS_URL", "redis://localhost:6379/0")
+    # Temp storage janitor: drop uploads unused for UPLOAD_TTL_SECONDS, then evict least recently used down to
+    # TEMP_QUOTA_BYTES (0 = no quota)
+    TEMP_JANITOR_ENABLED: bool = os.getenv("TEMP_JANITOR_ENABLED", "True").lower() == "true"
+    TEMP_JANITOR_INTERVAL_SECONDS: float = float(os.getenv("TEMP_JANITOR_INTERVAL_SECONDS", "300"))
+    UPLOAD_TTL_SECONDS: int = int(os.getenv("UPLOAD_TTL_SECONDS", "86400"))
+    TEMP_QUOTA_BYTES: int = int(os.getenv("TEMP_QUOTA_BYTES", "0"))
 
     # ML Model Settings
     # Stage 1: Parts-only detector (detects car parts without damage types)
     PART_MODEL_PATH: Path = Path(os.getenv("PART_MODEL_PATH", "models/yolov8n_part_detector.pt"))
     # Stage 2: Damage-only detector (detects damage types: dent, scratch, intact, etc.)
     DAMAGE_MODEL_PATH: Path = Path(os.getenv("DAMAGE_MODEL_PATH", "models/yolov8n_damage.pt"))
+    # Serving mode: "two_stage" chains both detectors, "combined" runs one {part}_{damage} detector
+    INFERENCE_MODE: str = os.getenv("INFERENCE_MODE", "two_stage")
+    COMBINED_MODEL_PATH: Path = Path(os.getenv("COMBINED_MODEL_PATH", "models/yolov8n_combined.pt"))
+    COMBINED_CONF_THRESHOLD: float = float(os.getenv("COMBINED_CONF_THRESHOLD", "0.25"))
     ML_DEVICE: str = os.getenv("ML_DEVICE", "cpu")
+    # Inference engine: "torch" serves the .pt weights, "onnxruntime"/"openvino" export them once
+    ML_ENGINE: str = os.getenv("ML_ENGINE", "torch")
+    MODEL_EXPORT_DIR: Path = Path(os.getenv("MODEL_EXPORT_DIR", "models/exported"))
     PART_CONF_THRESHOLD: float = float(os.getenv("PART_CONF_THRESHOLD", "0.25"))
     DAMAGE_CONF_THRESHOLD: float = float(os.getenv("DAMAGE_CONF_THRESHOLD", "0.25"))
     DAMAGE_MATCH_MIN_IOU: float = float(os.getenv("DAMAGE_MATCH_MIN_IOU", "0.1"))
+    # Model input size per stage; "fast"/"precise" requests scale it (rounded to the 32 px stride)
+    PART_IMGSZ: int = int(os.getenv("PART_IMGSZ", "640"))
+    DAMAGE_IMGSZ: int = int(os.getenv("DAMAGE_IMGSZ", "640"))
+    COMBINED_IMGSZ: int = int(os.getenv("COMBINED_IMGSZ", "640"))
+    QUALITY_FAST_SCALE: float = float(os.getenv("QUALITY_FAST_SCALE", "0.5"))
+    QUALITY_PRECISE_SCALE: float = float(os.getenv("QUALITY_PRECISE_SCALE", "1.5"))
+    # Upload-time preprocessing: EXIF-orient and downscale once into a memory-mappable .npy next to the upload
+    UPLOAD_PREPROCESS_ENABLED: bool = os.getenv("UPLOAD_PREPROCESS_ENABLED", "False").lower() == "true"
+    UPLOAD_PREPROCESS_MAX_SIDE: int = int(os.getenv("UPLOAD_PREPROCESS_MAX_SIDE", "0"))  # 0 = largest tier input size
+    # Max images sent to each YOLO stage per predict call (1 = one image per call)
+    INFERENCE_BATCH_SIZE: int = int(os.getenv("INFERENCE_BATCH_SIZE", "1"))
+    # "sequential" skips Stage 2 when no parts are found; "parallel" runs both stages at once
+    STAGE_EXECUTION_MODE: str = os.getenv("STAGE_EXECUTION_MODE", "sequential")
+    STAGE_EXECUTOR_WORKERS: int = int(os.getenv("STAGE_EXECUTOR_WORKERS", "2"))
+    # Part-crop cascade: Stage 2 runs on padded crops around the Stage 1 parts instead of the full frame
+    DAMAGE_CASCADE_ENABLED: bool = os.getenv("DAMAGE_CASCADE_ENABLED", "False").lower() == "true"
+    DAMAGE_CASCADE_PADDING: float = float(os.getenv("DAMAGE_CASCADE_PADDING", "0.15"))  # fraction of part size per side
+    DAMAGE_CASCADE_MAX_AREA_RATIO: float = float(os.getenv("DAMAGE_CASCADE_MAX_AREA_RATIO", "0.6"))  # else full frame
+    DAMAGE_CASCADE_MAX_CROPS: int = int(os.getenv("DAMAGE_CASCADE_MAX_CROPS", "4"))
+    # Cross-request micro-batching: images from concurrent /infer calls share predict batches
+    INFERENCE_SCHEDULER_ENABLED: bool = os.getenv("INFERENCE_SCHEDULER_ENABLED", "False").lower() == "true"
+    SCHEDULER_MAX_BATCH_SIZE: int = int(os.getenv("SCHEDULER_MAX_BATCH_SIZE", "16"))
+    SCHEDULER_MAX_WAIT_MS: float = float(os.getenv("SCHEDULER_MAX_WAIT_MS", "10"))
+    # Inference worker processes: 0 runs in the API process, -1 sizes the pool to the core count
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "0"))
+    INFERENCE_WORKER_THREADS: int = int(os.getenv("INFERENCE_WORKER_THREADS", "2"))
+    # Startup warmup: preload both models and run synthetic passes before reporting ready
+    MODEL_WARMUP_ENABLED: bool = os.getenv("MODEL_WARMUP_ENABLED", "True").lower() == "true"
+    MODEL_WARMUP_PASSES: int = int(os.getenv("MODEL_WARMUP_PASSES", "2"))
+    MODEL_WARMUP_IMGSZ: int = int(os.getenv("MODEL_WARMUP_IMGSZ", "640"))
+    # Hot model reload: poll the active weight files, and guard /admin with a shared token (unset = disabled)
+    MODEL_WATCH_ENABLED: bool = os.getenv("MODEL_WATCH_ENABLED", "False").lower() == "true"
+    MODEL_WATCH_INTERVAL_SECONDS: float = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "10"))
+    ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN") or None
+    # Result cache keyed by image SHA-256 + model weights + thresholds (LRU in memory, optional disk tier)
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "True").lower() == "true"
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+    RESULT_CACHE_DIR: Optional[Path] = Path(os.environ["RESULT_CACHE_DIR"]) if os.getenv("RESULT_CACHE_DIR") else None
+    # Claim-level dedup: photos whose 64-bit dHash differs by at most DEDUP_MAX_HAMMING bits reuse one result
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "False").lower() == "true"
+    DEDUP_MAX_HAMMING: int = int(os.getenv("DEDUP_MAX_HAMMING", "6"))
+    # Async inference jobs (/infer/jobs): SQLite store, bounded runner pool, finished results kept for the TTL
+    JOB_DB_PATH: Path = Path(os.getenv("JOB_DB_PATH", "data/jobs.sqlite3"))
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_QUEUED: int = int(os.getenv("JOB_MAX_QUEUED", "100"))  # 0 = unbounded
+    JOB_RESULT_TTL_SECONDS: int = int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
     COST_RULES_PATH: Path = Path(os.getenv("COST_RULES_PATH", "data/auto_damage_repair_costs_MASTER.csv"))
     
     # CORS Settings
@@ -1,6 +1,7 @@
 """Dependency injection for FastAPI."""
-from typing import Generator
-from fastapi import Depends
+import secrets
+from typing import Generator, Optional
+from fastapi import Depends, Header, HTTPException, status
 from apps.api.core.config import settings
 
 
@@ -8,3 +9,17 @@ def get_settings():
     """Dependency to get application settings."""
     return settings
 
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Allow the request only when X-Admin-Token matches ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)"
+        )
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token"
+        )
+
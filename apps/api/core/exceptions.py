@@ -34,6 +34,15 @@ class InferenceError(AutoDamageException):
         )
 
 
+class JobNotFoundError(AutoDamageException):
+    """Exception raised when an inference job is not found (or has expired)."""
+    def __init__(self, job_id: str):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+
+
 class CostEstimationError(AutoDamageException):
     """Exception raised when cost estimation fails."""
     def __init__(self, detail: str = "Cost estimation failed"):
@@ -0,0 +1,138 @@
+"""Prometheus metrics for the API (no-ops when prometheus_client is not installed)."""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # Fallback when prometheus_client isn't installed
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+    class _NoOpMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def inc(self, amount=1):
+            pass
+
+        def dec(self, amount=1):
+            pass
+
+        def set(self, value):
+            pass
+
+        def set_function(self, function):
+            pass
+
+        def observe(self, value):
+            pass
+
+    Counter = Gauge = Histogram = _NoOpMetric
+
+
+# Inference stages take tens of ms to seconds; postprocessing is much faster.
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram(
+    "auto_damage_stage_duration_seconds",
+    "Duration of one pipeline stage call (dedup, decode, part_detection, damage_detection, "
+    "combined_detection, matching, severity, cost, pdf)",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+IMAGE_LATENCY_SECONDS = Histogram(
+    "auto_damage_inference_image_seconds",
+    "Per-image inference latency by quality tier",
+    ["quality"],
+    buckets=_STAGE_BUCKETS,
+)
+IMAGES_TOTAL = Counter("auto_damage_images_processed_total", "Images run through inference", ["quality"])
+DETECTIONS_TOTAL = Counter("auto_damage_detections_total", "Detections returned, by damage type", ["damage_type"])
+FILTERED_INTACT_TOTAL = Counter("auto_damage_filtered_intact_total", "Intact detections filtered out of responses")
+DEDUPLICATED_IMAGES_TOTAL = Counter(
+    "auto_damage_deduplicated_images_total",
+    "Images that reused a near-identical photo's detections instead of running inference",
+)
+CACHED_IMAGES_TOTAL = Counter(
+    "auto_damage_cached_images_total",
+    "Images answered from the result cache instead of running inference",
+    ["quality", "result"],
+)
+RESULT_CACHE_LOOKUPS = Counter(
+    "auto_damage_result_cache_lookups_total",
+    "Result cache lookups (memory_hit, disk_hit, miss)",
+    ["result"],
+)
+SCHEDULER_BATCH_SIZE = Histogram(
+    "auto_damage_scheduler_batch_size",
+    "Images per micro-batch run by the scheduler",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "auto_damage_scheduler_queue_depth",
+    "Images waiting in the micro-batching scheduler",
+    multiprocess_mode="livesum",
+)
+MODEL_LOADED = Gauge(
+    "auto_damage_model_loaded",
+    "1 when a detector is loaded and ready to serve",
+    ["model"],
+    multiprocess_mode="max",
+)
+JANITOR_EVICTIONS_TOTAL = Counter(
+    "auto_damage_janitor_evictions_total",
+    "Uploads (ttl, quota) and unreferenced files (orphan) removed by the storage janitor",
+    ["reason"],
+)
+JANITOR_FREED_BYTES_TOTAL = Counter(
+    "auto_damage_janitor_freed_bytes_total",
+    "Bytes of temp storage freed by the storage janitor",
+    ["reason"],
+)
+TEMP_STORAGE_BYTES = Gauge(
+    "auto_damage_temp_storage_bytes",
+    "Bytes used under TEMP_DIR after the last janitor sweep",
+    multiprocess_mode="max",
+)
+IN_FLIGHT_REQUESTS = Gauge(
+    "auto_damage_in_flight_requests",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Record the duration of the enclosed block under ``stage``."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start_time)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the exposition payload and its content type."""
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed\n", CONTENT_TYPE_LATEST
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Inference worker processes write their samples to the shared dir.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,9 +1,18 @@
 """FastAPI application entry point."""
+import asyncio
 import logging
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from apps.api.core.config import settings
-from apps.api.routes import upload, infer, estimate, report, health
+from apps.api.core.metrics import IN_FLIGHT_REQUESTS, render_metrics
+from apps.api.routes import upload, infer, estimate, report, health, admin
+from apps.api.services.ml.inference import shutdown_scheduler
+from apps.api.services.ml.jobs import get_job_manager, shutdown_job_manager
+from apps.api.services.ml.model_reload import start_model_watcher, stop_model_watcher
+from apps.api.services.ml.warmup import mark_ready, run_warmup
+from apps.api.services.ml.worker_pool import shutdown_worker_pool
+from apps.api.utils.file_handler import file_handler
+from apps.api.utils.storage_janitor import start_storage_janitor, stop_storage_janitor
 
 # Configure logging
 logging.basicConfig(
@@ -30,12 +39,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def track_in_flight_requests(request: Request, call_next):
+    """Count requests being handled for the in-flight gauge."""
+    IN_FLIGHT_REQUESTS.inc()
+    try:
+        return await call_next(request)
+    finally:
+        IN_FLIGHT_REQUESTS.dec()
+
+
 # Register routes
 app.include_router(upload.router, prefix=settings.API_PREFIX)
 app.include_router(infer.router, prefix=settings.API_PREFIX)
 app.include_router(estimate.router, prefix=settings.API_PREFIX)
 app.include_router(report.router, prefix=settings.API_PREFIX)
 app.include_router(health.router, prefix=settings.API_PREFIX)
+app.include_router(admin.router, prefix=settings.API_PREFIX)
 
 
 @app.on_event("startup")
@@ -46,11 +67,29 @@ async def startup_event():
     logger.info(f"Upload directory: {settings.UPLOAD_DIR}")
     logger.info(f"Temp directory: {settings.TEMP_DIR}")
 
+    if settings.MODEL_WARMUP_ENABLED:
+        # Warm in the background; /health/ready reports 503 until it finishes.
+        loop = asyncio.get_running_loop()
+        app.state.warmup = loop.run_in_executor(None, run_warmup)
+    else:
+        mark_ready()
+
+    # Pick up inference jobs a previous process left queued or running.
+    get_job_manager().resume()
+    start_model_watcher()
+    start_storage_janitor()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event."""
     logger.info("Shutting down application")
+    stop_model_watcher()
+    stop_storage_janitor()
+    shutdown_job_manager()
+    shutdown_scheduler()
+    shutdown_worker_pool()
+    file_handler.shutdown()
 
 
 @app.get("/")
@@ -63,3 +102,10 @@ async def root():
         "health": f"{settings.API_PREFIX}/health"
     }
 
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
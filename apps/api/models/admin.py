@@ -0,0 +1,43 @@
+"""Pydantic models for admin endpoints."""
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+
+class ModelVersionInfo(BaseModel):
+    """A detector weights version currently serving."""
+    path: str = Field(..., description="Weights file the version was loaded from")
+    weights_hash: str = Field(..., description="SHA-256 of the weights file")
+    loaded_at: float = Field(..., description="Unix time the version started serving")
+    in_process: bool = Field(..., description="False when inference worker processes hold the model")
+
+
+class ModelVersionsResponse(BaseModel):
+    """Response model for listing serving detector versions."""
+    models: Dict[str, ModelVersionInfo] = Field(default_factory=dict)
+
+
+class ModelReloadResult(BaseModel):
+    """Outcome of a reload for one detector."""
+    status: str = Field(..., description="reloaded or unchanged")
+    path: str
+    previous_hash: Optional[str] = None
+    weights_hash: str
+
+
+class ModelReloadResponse(BaseModel):
+    """Response model for a model reload."""
+    models: Dict[str, ModelReloadResult] = Field(default_factory=dict)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "models": {
+                    "part": {
+                        "status": "reloaded",
+                        "path": "models/yolov8n_parts.pt",
+                        "previous_hash": "3f1c...",
+                        "weights_hash": "9a2b..."
+                    }
+                }
+            }
+        }
@@ -1,5 +1,5 @@
 """Pydantic models for detection results."""
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -28,13 +28,18 @@ class InferenceRequest(BaseModel):
     file_ids: List[str] = Field(..., min_length=1, description="List of file IDs to process")
     include_intact: bool = Field(default=True, description="Whether to include parts labeled intact")
     max_images: Optional[int] = Field(None, ge=1, description="Optional limit on number of images to process")
+    quality: Literal["fast", "standard", "precise"] = Field(
+        default="standard",
+        description="Resolution tier: fast for quick pre-checks, precise for final reports",
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "file_ids": ["uuid1", "uuid2"],
                 "include_intact": False,
-                "max_images": 2
+                "max_images": 2,
+                "quality": "standard"
             }
         }
 
@@ -43,6 +48,10 @@ class InferenceImageResult(BaseModel):
     """Per-image inference result."""
     image_id: str = Field(..., description="Image ID")
     detections: List[Detection] = Field(..., description="List of detections for this image")
+    duplicate_of: Optional[str] = Field(
+        None,
+        description="Image ID whose detections were reused because this photo is a near-duplicate of it",
+    )
 
     class Config:
         json_schema_extra = {
@@ -61,6 +70,21 @@ class InferenceImageResult(BaseModel):
         }
 
 
+class InferenceStreamSummary(BaseModel):
+    """Final record of a streamed inference run."""
+    count: int = Field(..., ge=0, description="Number of image results streamed")
+    include_intact: bool = Field(default=True, description="Whether intact detections are included")
+    filtered_count: int = Field(default=0, description="Number of detections filtered out (e.g., intact)")
+
+
+class TierLatencyStats(BaseModel):
+    """Recent per-image inference latency for one quality tier."""
+    count: int = Field(..., ge=0, description="Images in the recent window")
+    mean_ms: float = Field(..., ge=0, description="Mean latency per image (ms)")
+    p50_ms: float = Field(..., ge=0, description="Median latency per image (ms)")
+    p95_ms: float = Field(..., ge=0, description="95th percentile latency per image (ms)")
+
+
 class InferenceResponse(BaseModel):
     """Response model for inference endpoint."""
     results: List[InferenceImageResult] = Field(..., description="Per-image inference results")
@@ -0,0 +1,66 @@
+"""Pydantic models for asynchronous inference jobs."""
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from apps.api.models.detection import InferenceImageResult
+
+
+class JobSubmitResponse(BaseModel):
+    """Response model for job submission."""
+    job_id: str = Field(..., description="Job ID to poll")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    total: int = Field(..., ge=0, description="Number of images in the job")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "job-uuid-123",
+                "status": "queued",
+                "total": 200
+            }
+        }
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for job status and progress."""
+    job_id: str = Field(..., description="Job ID")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    total: int = Field(..., ge=0, description="Number of images in the job")
+    completed: int = Field(..., ge=0, description="Number of images processed so far")
+    progress: float = Field(..., ge=0.0, le=1.0, description="Fraction of images processed")
+    include_intact: bool = Field(..., description="Whether intact detections are included")
+    quality: str = Field(..., description="Resolution tier used")
+    filtered_count: int = Field(default=0, description="Number of detections filtered out (e.g., intact)")
+    error: Optional[str] = Field(None, description="Failure reason when status is failed")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    finished_at: Optional[float] = Field(None, description="Completion time (Unix seconds)")
+    expires_at: Optional[float] = Field(None, description="When finished results are deleted (Unix seconds)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "job-uuid-123",
+                "status": "running",
+                "total": 200,
+                "completed": 57,
+                "progress": 0.285,
+                "include_intact": False,
+                "quality": "standard",
+                "filtered_count": 12,
+                "error": None,
+                "created_at": 1760000000.0,
+                "finished_at": None,
+                "expires_at": None
+            }
+        }
+
+
+class JobResultsPage(BaseModel):
+    """One page of per-image results for a job."""
+    job_id: str = Field(..., description="Job ID")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    offset: int = Field(..., ge=0, description="Submission index of the first result requested")
+    limit: int = Field(..., ge=1, description="Maximum results per page")
+    next_offset: int = Field(..., ge=0, description="Offset to request next; unchanged when nothing new is ready")
+    total: int = Field(..., ge=0, description="Number of images in the job")
+    completed: int = Field(..., ge=0, description="Number of images processed so far")
+    results: List[InferenceImageResult] = Field(..., description="Per-image results, in submission order")
@@ -0,0 +1,30 @@
+"""Admin routes (guarded by X-Admin-Token)."""
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from apps.api.core.dependencies import require_admin_token
+from apps.api.core.exceptions import InferenceError
+from apps.api.models.admin import ModelReloadResponse, ModelVersionsResponse
+from apps.api.services.ml.model_reload import model_versions, reload_models
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/models", response_model=ModelVersionsResponse)
+async def list_models():
+    """List the detector weight versions currently serving."""
+    return ModelVersionsResponse(models=model_versions())
+
+
+@router.post("/models/reload", response_model=ModelReloadResponse)
+async def reload(force: bool = Query(False, description="Reload even if the weights hash is unchanged")):
+    """
+    Load, warm and swap in detectors whose weight files changed.
+
+    In-flight requests finish on the previous version; the call returns once
+    the new weights are serving.
+    """
+    try:
+        results = await run_in_threadpool(reload_models, force)
+    except Exception as e:
+        raise InferenceError(f"Model reload failed: {str(e)}")
+    return ModelReloadResponse(models=results)
@@ -1,5 +1,6 @@
 """Estimate route for cost estimation."""
 from fastapi import APIRouter, HTTPException
+from apps.api.core.metrics import stage_timer
 from apps.api.models.estimate import EstimateRequest, EstimateResponse
 from apps.api.services.severity.interface import score_severity
 from apps.api.services.cost_engine.interface import calculate_cost
@@ -25,15 +26,17 @@ async def estimate_cost(request: EstimateRequest):
             )
         
         # Score severity for detections
-        scored_detections = score_severity(request.detections)
+        with stage_timer("severity"):
+            scored_detections = score_severity(request.detections)
         
         # Calculate costs
-        result = calculate_cost(
-            scored_detections,
-            labor_rate=request.labor_rate,
-            use_oem_parts=request.use_oem_parts,
-            car_type=request.car_type,
-        )
+        with stage_timer("cost"):
+            result = calculate_cost(
+                scored_detections,
+                labor_rate=request.labor_rate,
+                use_oem_parts=request.use_oem_parts,
+                car_type=request.car_type,
+            )
         
         return EstimateResponse(**result)
     except Exception as e:
@@ -1,7 +1,10 @@
 """Health check route."""
+from typing import Dict, Optional
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from apps.api.core.config import settings
+from apps.api.services.ml.warmup import get_readiness, is_ready
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -10,6 +13,15 @@ class HealthResponse(BaseModel):
     """Health check response model."""
     status: str
     version: str
+    ready: bool = False
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness response model."""
+    status: str
+    ready: bool
+    timings_ms: Dict[str, float] = {}
+    error: Optional[str] = None
 
 
 @router.get("", response_model=HealthResponse, status_code=200)
@@ -17,10 +29,25 @@ async def health_check():
     """
     Health check endpoint.
     
-    Returns API status and version.
+    Returns API status, version and whether the models are warmed up.
     """
     return HealthResponse(
         status="healthy",
-        version=settings.APP_VERSION
+        version=settings.APP_VERSION,
+        ready=is_ready(),
     )
 
+
+@router.get("/ready", response_model=ReadinessResponse, status_code=200)
+async def readiness_check():
+    """
+    Readiness endpoint for load balancers.
+    
+    Returns 503 until both models are loaded and warmed up.
+    """
+    readiness = get_readiness()
+    body = ReadinessResponse(ready=is_ready(), **readiness)
+    if not body.ready:
+        return JSONResponse(status_code=503, content=body.model_dump())
+    return body
+
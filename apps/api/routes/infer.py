@@ -1,8 +1,24 @@
 """Inference route for ML inference."""
-from fastapi import APIRouter, HTTPException
-from apps.api.models.detection import InferenceRequest, InferenceResponse
-from apps.api.services.ml.inference import run_inference
-from apps.api.core.exceptions import FileNotFoundError
+import json
+import logging
+from typing import Dict, Iterator, Literal, Tuple
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from apps.api.models.detection import (
+    InferenceImageResult,
+    InferenceRequest,
+    InferenceResponse,
+    InferenceStreamSummary,
+    TierLatencyStats,
+)
+from apps.api.models.job import JobResultsPage, JobStatusResponse, JobSubmitResponse
+from apps.api.services.ml.inference import get_latency_stats, iter_inference, run_inference
+from apps.api.services.ml.jobs import QUEUED, RUNNING, QueueFullError, get_job_manager
+from apps.api.core.exceptions import FileNotFoundError, JobNotFoundError
+from apps.api.utils.file_handler import file_handler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/infer", tags=["inference"])
 
@@ -13,13 +29,18 @@ async def infer_damage(request: InferenceRequest):
     Run ML inference on uploaded images.
 
     Accepts file IDs from upload endpoint and returns detection results.
-    Supports optional filtering of intact parts and multiple images.
+    Supports optional filtering of intact parts, multiple images and a
+    resolution quality tier (fast / standard / precise).
     """
     try:
-        result = run_inference(
+        # Run off the event loop so concurrent requests can overlap (and share
+        # scheduler batches) instead of queueing behind one another.
+        result = await run_in_threadpool(
+            run_inference,
             file_ids=request.file_ids,
             include_intact=request.include_intact,
             max_images=request.max_images,
+            quality=request.quality,
         )
         return InferenceResponse(**result)
     except FileNotFoundError as e:
@@ -27,3 +48,150 @@ async def infer_damage(request: InferenceRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
 
+
+
+@router.get("/latency", response_model=Dict[str, TierLatencyStats], status_code=200)
+async def inference_latency():
+    """
+    Recent per-image inference latency for each quality tier.
+    """
+    return get_latency_stats()
+
+
+def _format_record(record_type: str, payload: dict, stream_format: str) -> str:
+    if stream_format == "sse":
+        return f"event: {record_type}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"type": record_type, **payload}) + "\n"
+
+
+def _stream_records(
+    results: Iterator[Tuple[int, InferenceImageResult, int]],
+    include_intact: bool,
+    stream_format: str,
+) -> Iterator[str]:
+    count = 0
+    filtered_count = 0
+    try:
+        for _, result, filtered in results:
+            count += 1
+            filtered_count += filtered
+            yield _format_record("result", result.model_dump(), stream_format)
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band and stop.
+        logger.exception("Streaming inference failed: %s", e)
+        yield _format_record("error", {"detail": f"Inference failed: {str(e)}"}, stream_format)
+        return
+    summary = InferenceStreamSummary(count=count, include_intact=include_intact, filtered_count=filtered_count)
+    yield _format_record("summary", summary.model_dump(), stream_format)
+
+
+@router.post("/stream", status_code=200)
+async def infer_damage_stream(
+    request: InferenceRequest,
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="Stream format"),
+):
+    """
+    Run ML inference and stream each image result as soon as it is ready.
+
+    Emits one ``result`` record per image (same shape as ``InferenceImageResult``,
+    possibly out of request order) followed by a ``summary`` record with
+    ``filtered_count``. ``format=ndjson`` writes one JSON object per line with
+    a ``type`` field; ``format=sse`` writes Server-Sent Events named after it.
+    """
+    try:
+        # Validates every file up front so a missing file is still a plain 404.
+        results = await run_in_threadpool(
+            iter_inference,
+            file_ids=request.file_ids,
+            include_intact=request.include_intact,
+            max_images=request.max_images,
+            quality=request.quality,
+        )
+    except FileNotFoundError as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # A sync iterator is consumed in Starlette's threadpool, off the event loop.
+    return StreamingResponse(
+        _stream_records(results, request.include_intact, format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _get_job(job_id: str) -> dict:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    return job
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_inference_job(request: InferenceRequest):
+    """
+    Queue ML inference for a large batch of images.
+
+    Returns a job ID immediately; poll ``/infer/jobs/{job_id}`` for progress
+    and page through ``/infer/jobs/{job_id}/results``.
+    """
+    file_ids = request.file_ids[:request.max_images] if request.max_images else request.file_ids
+    exists_flags = await run_in_threadpool(file_handler.files_exist, file_ids)
+    for file_id, exists in zip(file_ids, exists_flags):
+        if not exists:
+            raise FileNotFoundError(file_id)
+    try:
+        job_id = await run_in_threadpool(
+            get_job_manager().submit,
+            file_ids,
+            include_intact=request.include_intact,
+            quality=request.quality,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JobSubmitResponse(job_id=job_id, status="queued", total=len(file_ids))
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse, status_code=200)
+async def get_inference_job(job_id: str):
+    """
+    Job status and progress.
+    """
+    job = await run_in_threadpool(_get_job, job_id)
+    return JobStatusResponse(
+        job_id=job["id"],
+        progress=job["completed"] / job["total"] if job["total"] else 1.0,
+        **{key: job[key] for key in (
+            "status", "total", "completed", "include_intact", "quality",
+            "filtered_count", "error", "created_at", "finished_at", "expires_at",
+        )},
+    )
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsPage, status_code=200)
+async def get_inference_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Submission index of the first result (previous page's next_offset)"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum results per page"),
+):
+    """
+    One page of a job's per-image results, in submission order.
+
+    Available while the job runs: the page then stops before the first image
+    not processed yet, so polling with ``next_offset`` returns every result
+    exactly once.
+    """
+    job = await run_in_threadpool(_get_job, job_id)
+    running = job["status"] in (QUEUED, RUNNING)
+    page = await run_in_threadpool(get_job_manager().store.results, job_id, offset, limit, running)
+    return JobResultsPage(
+        job_id=job_id,
+        status=job["status"],
+        offset=offset,
+        limit=limit,
+        next_offset=page[-1][0] + 1 if page else offset,
+        total=job["total"],
+        completed=job["completed"],
+        results=[result for _, result in page],
+    )
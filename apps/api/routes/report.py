@@ -2,6 +2,7 @@
 import uuid
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from apps.api.core.metrics import stage_timer
 from apps.api.models.report import ReportData, ReportPDFRequest
 from apps.api.utils.pdf_generator import generate_pdf
 from apps.api.core.exceptions import ReportGenerationError
@@ -38,7 +39,8 @@ async def generate_report_pdf(request: ReportPDFRequest):
         _reports[report_id] = request.report_data
         
         # Generate PDF
-        pdf_buffer = generate_pdf(request.report_data)
+        with stage_timer("pdf"):
+            pdf_buffer = generate_pdf(request.report_data)
         
         return StreamingResponse(
             pdf_buffer,
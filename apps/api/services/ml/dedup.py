@@ -0,0 +1,52 @@
+"""Perceptual-hash grouping of near-identical photos within a claim."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from PIL import Image
+
+# dHash compares each pixel with its right neighbour on a 9x8 grayscale
+# thumbnail, giving a 64-bit hash robust to re-encoding and small shifts.
+_HASH_WIDTH = 9
+_HASH_HEIGHT = 8
+
+
+def perceptual_hash(image_path: Path) -> int:
+    """Return the 64-bit difference hash (dHash) of an image."""
+    with Image.open(image_path) as image:
+        # JPEG decodes straight at 1/8 scale; the hash only needs a thumbnail.
+        image.draft("L", (_HASH_WIDTH * 8, _HASH_HEIGHT * 8))
+        thumbnail = image.convert("L").resize((_HASH_WIDTH, _HASH_HEIGHT), Image.Resampling.BILINEAR)
+        pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(_HASH_HEIGHT):
+        offset = row * _HASH_WIDTH
+        for col in range(_HASH_WIDTH - 1):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def assign_representatives(hashes: List[int], max_distance: int) -> List[int]:
+    """
+    Map each position to the position of the image whose detections it reuses.
+
+    Images are visited in request order; an image within ``max_distance`` bits
+    of an earlier representative reuses it, otherwise it becomes one itself.
+    """
+    representatives: List[int] = []
+    assignment: List[int] = []
+    for idx, value in enumerate(hashes):
+        match = next(
+            (rep for rep in representatives if hamming_distance(hashes[rep], value) <= max_distance),
+            None,
+        )
+        if match is None:
+            representatives.append(idx)
+            match = idx
+        assignment.append(match)
+    return assignment
@@ -1,49 +1,81 @@
-"""Two-stage ML inference service (part detector + damage detector)."""
+"""ML inference service (two-stage part + damage detectors, or one combined detector)."""
 from __future__ import annotations
 
 import logging
-from typing import Dict, List, Optional
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import numpy as np
 
 from apps.api.core.config import settings
 from apps.api.core.exceptions import FileNotFoundError as APIFileNotFoundError
+from apps.api.core.metrics import (
+    CACHED_IMAGES_TOTAL,
+    DEDUPLICATED_IMAGES_TOTAL,
+    DETECTIONS_TOTAL,
+    FILTERED_INTACT_TOTAL,
+    IMAGE_LATENCY_SECONDS,
+    IMAGES_TOTAL,
+    stage_timer,
+)
 import time
 
 from apps.api.models.detection import Detection, InferenceImageResult
 from apps.api.services.ml.model_loader import (
+    decode_image,
+    detect_combined_batch,
     detect_damage,
+    detect_damage_batch,
     detect_parts,
+    detect_parts_batch,
+    inference_mode,
     ModelNotFoundError,
+    QUALITY_TIERS,
+    region_imgsz,
+    resolve_imgsz,
 )
+from apps.api.services.ml.dedup import assign_representatives
+from apps.api.services.ml.preprocess import load_preprocessed
+from apps.api.services.ml.result_cache import get_result_cache, result_cache_key
+from apps.api.services.ml.scheduler import InferenceScheduler
+from apps.api.services.ml.worker_pool import get_worker_pool
 from apps.api.utils.file_handler import file_handler
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+U = TypeVar("U")
+
+_stage_executor: Optional[ThreadPoolExecutor] = None
+_stage_executor_lock = threading.Lock()
 
-def _canonicalize(label: str) -> str:
-    return label.strip().lower().replace(" ", "_").replace("-", "_")
+_scheduler: Optional[InferenceScheduler] = None
+_scheduler_lock = threading.Lock()
 
+# Recent per-image latencies for each quality tier
+_LATENCY_WINDOW = 1024
+_tier_latency: Dict[str, Deque[float]] = {tier: deque(maxlen=_LATENCY_WINDOW) for tier in QUALITY_TIERS}
+_tier_latency_lock = threading.Lock()
 
-def _compute_iou(box_a: List[float], box_b: List[float]) -> float:
-    ax1, ay1, ax2, ay2 = box_a
-    bx1, by1, bx2, by2 = box_b
 
-    ix1 = max(ax1, bx1)
-    iy1 = max(ay1, by1)
-    ix2 = min(ax2, bx2)
-    iy2 = min(ay2, by2)
+def _compute_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes as an (N, M) matrix."""
+    ix1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    iy1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    ix2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    iy2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
 
-    inter_w = max(0.0, ix2 - ix1)
-    inter_h = max(0.0, iy2 - iy1)
-    inter_area = inter_w * inter_h
-    if inter_area <= 0:
-        return 0.0
+    inter_area = np.maximum(0.0, ix2 - ix1) * np.maximum(0.0, iy2 - iy1)
+    area_a = np.maximum(0.0, boxes_a[:, 2] - boxes_a[:, 0]) * np.maximum(0.0, boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = np.maximum(0.0, boxes_b[:, 2] - boxes_b[:, 0]) * np.maximum(0.0, boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter_area
 
-    area_a = max(0.0, ax2 - ax1) * max(0.0, ay2 - ay1)
-    area_b = max(0.0, bx2 - bx1) * max(0.0, by2 - by1)
-    union = area_a + area_b - inter_area
-    if union <= 0:
-        return 0.0
-    return inter_area / union
+    iou = np.zeros_like(inter_area)
+    np.divide(inter_area, union, out=iou, where=(inter_area > 0) & (union > 0))
+    return iou
 
 
 def _match_damage_to_parts(
@@ -51,44 +83,49 @@ def _match_damage_to_parts(
     damages: List[Dict],
     iou_threshold: float,
 ) -> List[Detection]:
-    """Assign the highest-confidence damage prediction to each part."""
-    assignments: Dict[int, Dict[str, Optional[float]]] = {}
-    for idx, part in enumerate(parts):
-        assignments[idx] = {
-            "damage_type": "intact",
-            "confidence": part["confidence"],
-        }
+    """Assign the highest-confidence damage prediction to each part.
+
+    Labels are expected to be canonical already (see ``model_loader``).
+    """
+    if not parts:
+        return []
+
+    part_conf = np.array([part["confidence"] for part in parts], dtype=np.float64)
+    # intact handled via fallback
+    candidates = [idx for idx, damage in enumerate(damages) if damage["label"] != "intact"]
 
-    for damage in damages:
-        damage_label = _canonicalize(damage["label"])
-        if damage_label == "intact":
-            continue  # intact handled via fallback
-
-        best_idx: Optional[int] = None
-        best_iou = 0.0
-        for idx, part in enumerate(parts):
-            iou = _compute_iou(part["bbox"], damage["bbox"])
-            if iou > best_iou:
-                best_iou = iou
-                best_idx = idx
-
-        if best_idx is not None and best_iou >= iou_threshold:
-            current_conf = assignments[best_idx]["confidence"] or 0.0
-            if damage["confidence"] > current_conf:
-                assignments[best_idx] = {
-                    "damage_type": damage_label,
-                    "confidence": damage["confidence"],
-                }
+    winners = np.full(len(parts), -1, dtype=np.int64)
+    if candidates:
+        part_boxes = np.array([part["bbox"] for part in parts], dtype=np.float64).reshape(-1, 4)
+        damage_boxes = np.array([damages[idx]["bbox"] for idx in candidates], dtype=np.float64).reshape(-1, 4)
+        damage_conf = np.array([damages[idx]["confidence"] for idx in candidates], dtype=np.float64)
+
+        # Each damage goes to the first part with the highest non-zero IoU, and
+        # only counts if it is more confident than the part itself.
+        iou = _compute_iou_matrix(part_boxes, damage_boxes)
+        best_part = iou.argmax(axis=0)
+        best_iou = iou[best_part, np.arange(len(candidates))]
+        matched = (best_iou > 0) & (best_iou >= iou_threshold) & (damage_conf > part_conf[best_part])
+
+        # Per part, keep the most confident matched damage (earliest on ties).
+        owned = matched[None, :] & (best_part[None, :] == np.arange(len(parts))[:, None])
+        scores = np.where(owned, damage_conf[None, :], -np.inf)
+        winners = np.where(owned.any(axis=1), scores.argmax(axis=1), -1)
 
     detections: List[Detection] = []
     for idx, part in enumerate(parts):
-        assigned = assignments.get(idx, {"damage_type": "intact", "confidence": part["confidence"]})
-        damage_type = assigned["damage_type"] or "intact"
-        damage_conf = assigned["confidence"] or part["confidence"]
-        final_conf = min(part["confidence"], damage_conf)
+        damage_type: Optional[str] = "intact"
+        damage_conf_value = part["confidence"]
+        if winners[idx] >= 0:
+            damage_idx = candidates[winners[idx]]
+            damage_type = damages[damage_idx]["label"]
+            damage_conf_value = damages[damage_idx]["confidence"]
+        damage_type = damage_type or "intact"
+        damage_conf_value = damage_conf_value or part["confidence"]
+        final_conf = min(part["confidence"], damage_conf_value)
         detections.append(
             Detection(
-                part=_canonicalize(part["label"]),
+                part=part["label"],
                 damage_type=damage_type,
                 confidence=final_conf,
                 bbox=part["bbox"],
@@ -98,110 +135,573 @@ def _match_damage_to_parts(
     return detections
 
 
-def _prepare_part_predictions(raw_predictions: List[Dict]) -> List[Dict]:
-    prepared = []
-    for pred in raw_predictions:
-        prepared.append(
-            {
-                "label": _canonicalize(pred["label"]),
-                "confidence": float(pred["confidence"]),
-                "bbox": pred["bbox"],
-            }
-        )
-    return prepared
+def _parallel_stages() -> bool:
+    return settings.STAGE_EXECUTION_MODE.strip().lower() == "parallel"
 
 
-def _prepare_damage_predictions(raw_predictions: List[Dict]) -> List[Dict]:
-    prepared = []
-    for pred in raw_predictions:
-        prepared.append(
-            {
-                "label": _canonicalize(pred["label"]),
-                "confidence": float(pred["confidence"]),
-                "bbox": pred["bbox"],
+def _get_stage_executor() -> ThreadPoolExecutor:
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is None:
+            _stage_executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.STAGE_EXECUTOR_WORKERS),
+                thread_name_prefix="damage-stage",
+            )
+    return _stage_executor
+
+
+def _run_stages(run_parts: Callable[[], T], run_damage: Callable[[], U]) -> Tuple[T, U]:
+    """Run Stage 2 speculatively on the stage executor while Stage 1 runs here."""
+    damage_future = _get_stage_executor().submit(run_damage)
+    try:
+        part_result = run_parts()
+    except Exception:
+        damage_future.cancel()
+        raise
+    return part_result, damage_future.result()
+
+
+def _cascade_enabled() -> bool:
+    return settings.DAMAGE_CASCADE_ENABLED
+
+
+def _merge_overlapping(boxes: List[List[float]]) -> List[List[float]]:
+    merged = True
+    while merged:
+        merged = False
+        result: List[List[float]] = []
+        for box in boxes:
+            for other in result:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    other[:] = [
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    ]
+                    merged = True
+                    break
+            else:
+                result.append(list(box))
+        boxes = result
+    return boxes
+
+
+def _cascade_crops(
+    part_preds: List[Dict],
+    height: int,
+    width: int,
+    imgsz: int,
+) -> Optional[List[Tuple[Tuple[int, int, int, int], int]]]:
+    """
+    Padded crops covering the detected parts, each with its own input size.
+
+    A crop runs at the pixel scale the full frame gets at ``imgsz``, so its
+    cost follows its size. Returns None when the full frame is the better
+    input: the parts fill most of it, or the crops together would cost at
+    least one full-frame pass.
+    """
+    pad = settings.DAMAGE_CASCADE_PADDING
+    boxes = []
+    for pred in part_preds:
+        x1, y1, x2, y2 = pred["bbox"]
+        pad_x = (x2 - x1) * pad
+        pad_y = (y2 - y1) * pad
+        boxes.append([
+            max(0.0, x1 - pad_x),
+            max(0.0, y1 - pad_y),
+            min(float(width), x2 + pad_x),
+            min(float(height), y2 + pad_y),
+        ])
+
+    boxes = _merge_overlapping(boxes)
+    if len(boxes) > settings.DAMAGE_CASCADE_MAX_CROPS:
+        boxes = [[
+            min(box[0] for box in boxes),
+            min(box[1] for box in boxes),
+            max(box[2] for box in boxes),
+            max(box[3] for box in boxes),
+        ]]
+
+    # Close-ups where the parts fill most of the frame keep the full-frame pass.
+    crop_area = sum((box[2] - box[0]) * (box[3] - box[1]) for box in boxes)
+    if crop_area >= settings.DAMAGE_CASCADE_MAX_AREA_RATIO * width * height:
+        return None
+
+    longest_side = max(width, height)
+    crops = []
+    for x1, y1, x2, y2 in boxes:
+        crop = (int(math.floor(x1)), int(math.floor(y1)), int(math.ceil(x2)), int(math.ceil(y2)))
+        if crop[2] > crop[0] and crop[3] > crop[1]:
+            crop_side = max(crop[2] - crop[0], crop[3] - crop[1])
+            crops.append((crop, region_imgsz(imgsz, crop_side / longest_side)))
+
+    # Predict cost grows with the square of the (letterboxed) input size.
+    if not crops or sum(crop_imgsz ** 2 for _, crop_imgsz in crops) >= imgsz ** 2:
+        return None
+    return crops
+
+
+def _detect_damage_stage(
+    images: List[np.ndarray],
+    part_batches: List[List[Dict]],
+    imgsz: int,
+) -> List[List[Dict]]:
+    """Run Stage 2 on full frames, or on part crops when the cascade is enabled."""
+    if not _cascade_enabled():
+        if len(images) == 1:
+            return [detect_damage(images[0], imgsz)]
+        return detect_damage_batch(images, imgsz)
+
+    # One predict call per input size; owners are (image index, x offset, y offset).
+    sources: List[np.ndarray] = []
+    owners: List[Tuple[int, int, int]] = []
+    by_imgsz: Dict[int, List[int]] = {}
+    for idx, (image, part_preds) in enumerate(zip(images, part_batches)):
+        height, width = image.shape[:2]
+        crops = _cascade_crops(part_preds, height, width, imgsz)
+        if crops is None:
+            by_imgsz.setdefault(imgsz, []).append(len(sources))
+            sources.append(image)
+            owners.append((idx, 0, 0))
+            continue
+        for (x1, y1, x2, y2), crop_imgsz in crops:
+            by_imgsz.setdefault(crop_imgsz, []).append(len(sources))
+            sources.append(np.ascontiguousarray(image[y1:y2, x1:x2]))
+            owners.append((idx, x1, y1))
+
+    raw_damage: List[List[Dict]] = [[] for _ in sources]
+    for source_imgsz, positions in by_imgsz.items():
+        if len(positions) == 1:
+            results = [detect_damage(sources[positions[0]], source_imgsz)]
+        else:
+            results = detect_damage_batch([sources[pos] for pos in positions], source_imgsz)
+        for pos, damage_preds in zip(positions, results):
+            raw_damage[pos] = damage_preds
+
+    # Shift crop-relative boxes back into image coordinates (in crop order,
+    # so matching ties resolve the same whatever the batching).
+    damage_batches: List[List[Dict]] = [[] for _ in images]
+    for (idx, offset_x, offset_y), damage_preds in zip(owners, raw_damage):
+        for pred in damage_preds:
+            x1, y1, x2, y2 = pred["bbox"]
+            pred["bbox"] = [x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y]
+            damage_batches[idx].append(pred)
+    return damage_batches
+
+
+def _load_image(image_path) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """Return the upload-time preprocessed array when present, else the decoded original, with its scale."""
+    with stage_timer("decode"):
+        preprocessed = load_preprocessed(image_path)
+        if preprocessed is not None:
+            image, scale_x, scale_y = preprocessed
+            return image, (scale_x, scale_y)
+        return decode_image(image_path), (1.0, 1.0)
+
+
+def _to_original(detections: List[Detection], scale: Tuple[float, float]) -> List[Detection]:
+    """Map boxes found on a downscaled array back to original pixel coordinates."""
+    scale_x, scale_y = scale
+    if scale_x == 1.0 and scale_y == 1.0:
+        return detections
+    return [
+        detection.model_copy(
+            update={
+                "bbox": [
+                    detection.bbox[0] / scale_x,
+                    detection.bbox[1] / scale_y,
+                    detection.bbox[2] / scale_x,
+                    detection.bbox[3] / scale_y,
+                ]
             }
         )
-    return prepared
-
-
-def _process_image(image_path) -> List[Detection]:
-    part_preds = _prepare_part_predictions(detect_parts(image_path))
-    if not part_preds:
-        logger.info("No parts detected for %s", image_path)
-        return []
-
-    damage_preds = _prepare_damage_predictions(detect_damage(image_path))
-    return _match_damage_to_parts(
-        part_preds,
-        damage_preds,
-        settings.DAMAGE_MATCH_MIN_IOU,
+        for detection in detections
+    ]
+
+
+def _process_image(image_path, quality: str = "standard") -> List[Detection]:
+    # Decode once; both stages share the same array instead of re-reading the file.
+    image, scale = _load_image(image_path)
+    part_imgsz = resolve_imgsz("part", quality)
+    damage_imgsz = resolve_imgsz("damage", quality)
+    # The cascade needs the part boxes first, so it always runs the stages in order.
+    if _parallel_stages() and not _cascade_enabled():
+        part_preds, damage_preds = _run_stages(
+            lambda: detect_parts(image, part_imgsz),
+            lambda: detect_damage(image, damage_imgsz),
+        )
+        if not part_preds:
+            logger.info("No parts detected for %s", image_path)
+            return []
+    else:
+        part_preds = detect_parts(image, part_imgsz)
+        if not part_preds:
+            logger.info("No parts detected for %s", image_path)
+            return []
+        damage_preds = _detect_damage_stage([image], [part_preds], damage_imgsz)[0]
+
+    with stage_timer("matching"):
+        detections = _match_damage_to_parts(
+            part_preds,
+            damage_preds,
+            settings.DAMAGE_MATCH_MIN_IOU,
+        )
+    return _to_original(detections, scale)
+
+
+def _process_batch(image_paths: List, quality: str = "standard") -> List[List[Detection]]:
+    """Run both stages over a batch of images with one predict call per stage."""
+    images, scales = zip(*(_load_image(path) for path in image_paths))
+    images = list(images)
+    part_imgsz = resolve_imgsz("part", quality)
+    damage_imgsz = resolve_imgsz("damage", quality)
+    damage_batches: Dict[int, List[Dict]] = {}
+    if _parallel_stages() and not _cascade_enabled():
+        part_batches, raw_damage = _run_stages(
+            lambda: detect_parts_batch(images, part_imgsz),
+            lambda: detect_damage_batch(images, damage_imgsz),
+        )
+        damage_batches = dict(enumerate(raw_damage))
+    else:
+        part_batches = detect_parts_batch(images, part_imgsz)
+
+        # Keep the skip-if-no-parts shortcut: only images with parts reach Stage 2.
+        with_parts = [idx for idx, part_preds in enumerate(part_batches) if part_preds]
+        if with_parts:
+            raw_damage = _detect_damage_stage(
+                [images[idx] for idx in with_parts],
+                [part_batches[idx] for idx in with_parts],
+                damage_imgsz,
+            )
+            damage_batches = dict(zip(with_parts, raw_damage))
+
+    batch_detections: List[List[Detection]] = []
+    for idx, part_preds in enumerate(part_batches):
+        if not part_preds:
+            logger.info("No parts detected for %s", image_paths[idx])
+            batch_detections.append([])
+            continue
+        with stage_timer("matching"):
+            detections = _match_damage_to_parts(
+                part_preds,
+                damage_batches[idx],
+                settings.DAMAGE_MATCH_MIN_IOU,
+            )
+        batch_detections.append(_to_original(detections, scales[idx]))
+    return batch_detections
+
+
+def _process_combined(image_paths: List, quality: str = "standard") -> List[List[Detection]]:
+    """Single forward pass per image with the combined part+damage detector."""
+    images, scales = zip(*(_load_image(path) for path in image_paths))
+    batch_predictions = detect_combined_batch(list(images), resolve_imgsz("combined", quality))
+    batch_detections: List[List[Detection]] = []
+    for image_path, scale, predictions in zip(image_paths, scales, batch_predictions):
+        if not predictions:
+            logger.info("No parts detected for %s", image_path)
+        detections = [
+            Detection(
+                part=pred["part"],
+                damage_type=pred["damage_type"],
+                confidence=pred["confidence"],
+                bbox=pred["bbox"],
+                severity=None,
+            )
+            for pred in predictions
+        ]
+        batch_detections.append(_to_original(detections, scale))
+    return batch_detections
+
+
+def _run_images(image_paths: List, quality: str = "standard") -> List[List[Detection]]:
+    if inference_mode() == "combined":
+        return _process_combined(image_paths, quality)
+    if len(image_paths) == 1:
+        return [_process_image(image_paths[0], quality)]
+    return _process_batch(image_paths, quality)
+
+
+def _execute_images(image_paths: List, quality: str = "standard", batch_size: int = 0) -> List[List[Detection]]:
+    """Run images in the worker pool when one is configured, else in-process."""
+    pool = get_worker_pool()
+    if pool is not None:
+        return pool.run(image_paths, quality, batch_size)
+    return _run_images(image_paths, quality)
+
+
+def get_scheduler() -> InferenceScheduler:
+    """Return the shared cross-request micro-batching scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            pool = get_worker_pool()
+            _scheduler = InferenceScheduler(
+                _execute_images,
+                max_batch_size=settings.SCHEDULER_MAX_BATCH_SIZE,
+                max_wait_ms=settings.SCHEDULER_MAX_WAIT_MS,
+                # Keep every worker process busy with its own batch.
+                max_concurrent_batches=pool.size if pool is not None else 1,
+            )
+    return _scheduler
+
+
+def shutdown_scheduler() -> None:
+    """Stop the scheduler thread if it was started."""
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+
+
+def _iter_detect_images(image_paths: List, quality: str) -> Iterator[List[List[Detection]]]:
+    """Yield detections in groups, in order, as soon as each group of images is done."""
+    if settings.INFERENCE_SCHEDULER_ENABLED:
+        futures = [get_scheduler().submit(path, quality) for path in image_paths]
+        for future in futures:
+            yield [future.result()]
+        return
+    pool = get_worker_pool()
+    if pool is not None:
+        # Spread the claim over the workers in INFERENCE_BATCH_SIZE jobs.
+        yield from pool.iter_run(image_paths, quality, max(1, settings.INFERENCE_BATCH_SIZE))
+        return
+    batch_size = max(1, settings.INFERENCE_BATCH_SIZE)
+    for offset in range(0, len(image_paths), batch_size):
+        yield _run_images(image_paths[offset:offset + batch_size], quality)
+
+
+def _iter_detect_with_cache(
+    image_ids: List[str],
+    image_paths: List,
+    quality: str,
+) -> Iterator[List[Tuple[int, List[Detection], bool]]]:
+    """
+    Yield ``(position, detections, cached)`` groups, serving cache hits first
+    and running only the misses.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        pending = list(range(len(image_paths)))
+        cache_keys: List[Optional[str]] = [None] * len(image_paths)
+    else:
+        cache_keys = [result_cache_key(image_hash, quality) for image_hash in file_handler.get_file_hashes(image_ids)]
+        cached = [(idx, cache.get(key)) for idx, key in enumerate(cache_keys)]
+        hits = [(idx, detections, True) for idx, detections in cached if detections is not None]
+        pending = [idx for idx, detections in cached if detections is None]
+        if hits:
+            yield hits
+
+    if not pending:
+        return
+    position = 0
+    for group in _iter_detect_images([image_paths[idx] for idx in pending], quality):
+        results = []
+        for detections in group:
+            idx = pending[position]
+            position += 1
+            if cache is not None:
+                cache.put(cache_keys[idx], detections)
+            results.append((idx, detections, False))
+        yield results
+
+
+def _dedup_assignment(image_ids: List[str]) -> List[int]:
+    """Map each position to the position whose detections it reuses (itself if unique)."""
+    try:
+        with stage_timer("dedup"):
+            hashes = file_handler.get_perceptual_hashes(image_ids)
+    except Exception as exc:
+        # Dedup is an optimization: run every image rather than fail the request.
+        logger.warning("Perceptual hashing failed, skipping dedup: %s", exc)
+        return list(range(len(image_ids)))
+    return assign_representatives(hashes, settings.DEDUP_MAX_HAMMING)
+
+
+def _iter_detect_deduplicated(
+    image_ids: List[str],
+    image_paths: List,
+    quality: str,
+) -> Iterator[List[Tuple[int, List[Detection], Optional[int], bool]]]:
+    """
+    Yield ``(position, detections, representative position or None, cached)``
+    groups, running inference only on one image per group of near-duplicates.
+    """
+    if settings.DEDUP_ENABLED and len(image_ids) > 1:
+        assignment = _dedup_assignment(image_ids)
+    else:
+        assignment = list(range(len(image_ids)))
+    representatives = [idx for idx, rep in enumerate(assignment) if rep == idx]
+    duplicates: Dict[int, List[int]] = {}
+    for idx, rep in enumerate(assignment):
+        if rep != idx:
+            duplicates.setdefault(rep, []).append(idx)
+
+    groups = _iter_detect_with_cache(
+        [image_ids[idx] for idx in representatives],
+        [image_paths[idx] for idx in representatives],
+        quality,
     )
+    for group in groups:
+        results = []
+        for position, detections, cached in group:
+            idx = representatives[position]
+            results.append((idx, detections, None, cached))
+            results.extend((dup, detections, idx, cached) for dup in duplicates.get(idx, ()))
+        yield results
+
+
+def _record_latency(quality: str, latency_ms: float, count: int) -> None:
+    with _tier_latency_lock:
+        _tier_latency[quality].extend([latency_ms] * count)
+
+
+def get_latency_stats() -> Dict[str, Dict[str, float]]:
+    """Return per-image latency stats for each quality tier over the recent window."""
+    with _tier_latency_lock:
+        samples = {tier: list(latencies) for tier, latencies in _tier_latency.items()}
+    stats = {}
+    for tier, latencies in samples.items():
+        if not latencies:
+            stats[tier] = {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+            continue
+        values = np.asarray(latencies)
+        stats[tier] = {
+            "count": len(latencies),
+            "mean_ms": round(float(values.mean()), 2),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+        }
+    return stats
 
 
-def run_inference(
+def iter_inference(
     file_ids: List[str],
     include_intact: bool = True,
     max_images: Optional[int] = None,
-) -> dict:
+    quality: str = "standard",
+) -> Iterator[Tuple[int, InferenceImageResult, int]]:
     """
-    Run two-stage ML inference on uploaded images.
+    Run ML inference on uploaded images and yield each result as soon as it is ready.
+
+    Inputs are validated before anything runs, so a missing file raises here
+    rather than part-way through the stream. Results may arrive out of
+    request order (e.g. cache hits first).
 
     Args:
         file_ids: List of file IDs to process
         include_intact: Whether to include intact detections
         max_images: Optional limit on number of images to process
+        quality: Resolution tier ("fast", "standard" or "precise")
 
     Returns:
-        Dictionary with image_id and detections
+        Iterator of (position in the request, image result, detections filtered out)
     """
-    if not file_ids:
-        return {"results": [], "include_intact": include_intact, "filtered_count": 0}
-
-    processed = []
-    filtered_count = 0
+    if quality not in QUALITY_TIERS:
+        raise ValueError(f"Unsupported quality tier '{quality}'. Use one of: {', '.join(QUALITY_TIERS)}")
 
     limited_file_ids = file_ids[:max_images] if max_images else file_ids
-
-    for image_id in limited_file_ids:
-        if not file_handler.file_exists(image_id):
+    image_paths = file_handler.get_file_paths(limited_file_ids)
+    for image_id, image_path in zip(limited_file_ids, image_paths):
+        if not image_path.exists():
             raise APIFileNotFoundError(image_id)
-
-        image_path = file_handler.get_file_path(image_id)
-
-        start_time = time.perf_counter()
+    file_handler.touch_files(limited_file_ids)
+
+    return _iter_results(limited_file_ids, image_paths, include_intact, quality)
+
+
+def _iter_results(
+    image_ids: List[str],
+    image_paths: List,
+    include_intact: bool,
+    quality: str,
+) -> Iterator[Tuple[int, InferenceImageResult, int]]:
+    if not image_ids:
+        return
+    groups = _iter_detect_deduplicated(image_ids, image_paths, quality)
+    start_time = time.perf_counter()
+    while True:
         try:
-            detections = _process_image(image_path)
+            group = next(groups)
+        except StopIteration:
+            return
         except ModelNotFoundError as exc:
             logger.error("Inference failed: %s", exc)
             raise
         except Exception as exc:  # pragma: no cover
             logger.exception("Unexpected error during inference: %s", exc)
             raise
-        latency_ms = (time.perf_counter() - start_time) * 1000
-
-        if not include_intact:
-            before = len(detections)
-            detections = [d for d in detections if d.damage_type != "intact"]
-            filtered_count += before - len(detections)
-
-        logger.info(
-            "Inference complete for %s (detections=%d, latency=%.2fms, include_intact=%s)",
-            image_id,
-            len(detections),
-            latency_ms,
-            include_intact,
-        )
-
-        processed.append(
-            InferenceImageResult(
-                image_id=image_id,
-                detections=detections,
+        # Images finished together (one batch) share the wait since the previous group;
+        # cache hits and deduplicated images ran nothing and are left out of the
+        # image count and latency stats.
+        processed = sum(1 for _, _, rep, cached in group if rep is None and not cached)
+        hits = sum(1 for _, _, rep, cached in group if rep is None and cached)
+        now = time.perf_counter()
+        latency_ms = (now - start_time) * 1000 / max(1, processed)
+        start_time = now
+        _record_latency(quality, latency_ms, processed)
+        IMAGES_TOTAL.labels(quality=quality).inc(processed)
+        CACHED_IMAGES_TOTAL.labels(quality=quality, result="hit").inc(hits)
+        DEDUPLICATED_IMAGES_TOTAL.inc(len(group) - processed - hits)
+
+        for idx, detections, rep, cached in group:
+            ran = rep is None and not cached
+            if ran:
+                IMAGE_LATENCY_SECONDS.labels(quality=quality).observe(latency_ms / 1000)
+            image_id = image_ids[idx]
+            duplicate_of = image_ids[rep] if rep is not None else None
+            filtered = 0
+            if not include_intact:
+                before = len(detections)
+                detections = [d for d in detections if d.damage_type != "intact"]
+                filtered = before - len(detections)
+                FILTERED_INTACT_TOTAL.inc(filtered)
+            for detection in detections:
+                DETECTIONS_TOTAL.labels(damage_type=detection.damage_type).inc()
+
+            logger.info(
+                "Inference complete for %s (detections=%d, latency=%.2fms, quality=%s, include_intact=%s, "
+                "duplicate_of=%s, cached=%s)",
+                image_id,
+                len(detections),
+                latency_ms if ran else 0.0,
+                quality,
+                include_intact,
+                duplicate_of,
+                cached,
             )
-        )
+
+            yield idx, InferenceImageResult(image_id=image_id, detections=detections, duplicate_of=duplicate_of), filtered
+
+
+def run_inference(
+    file_ids: List[str],
+    include_intact: bool = True,
+    max_images: Optional[int] = None,
+    quality: str = "standard",
+) -> dict:
+    """
+    Run ML inference on uploaded images.
+
+    Args:
+        file_ids: List of file IDs to process
+        include_intact: Whether to include intact detections
+        max_images: Optional limit on number of images to process
+        quality: Resolution tier ("fast", "standard" or "precise")
+
+    Returns:
+        Dictionary with image_id and detections
+    """
+    if not file_ids:
+        return {"results": [], "include_intact": include_intact, "filtered_count": 0}
+
+    results = {}
+    filtered_count = 0
+    for idx, result, filtered in iter_inference(file_ids, include_intact, max_images, quality):
+        results[idx] = result
+        filtered_count += filtered
 
     return {
-        "results": processed,
+        "results": [results[idx] for idx in sorted(results)],
         "include_intact": include_intact,
         "filtered_count": filtered_count,
     }
-
@@ -0,0 +1,335 @@
+"""Asynchronous inference jobs persisted in a local SQLite file."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from apps.api.core.config import settings
+from apps.api.services.ml.inference import iter_inference
+from apps.api.utils.file_handler import file_handler
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    file_ids TEXT NOT NULL,
+    file_paths TEXT NOT NULL,
+    include_intact INTEGER NOT NULL,
+    quality TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    filtered_count INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner_pid INTEGER,
+    owner_token TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+"""
+
+# Identifies this process instance: PIDs repeat across container restarts
+# (the API is often PID 1 every time), so a PID alone can't tell a dead owner.
+_BOOT_TOKEN = uuid.uuid4().hex
+
+_manager: Optional["JobManager"] = None
+_manager_lock = threading.Lock()
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many jobs are already waiting to run."""
+
+
+def _owner_alive(pid: Optional[int], token: Optional[str]) -> bool:
+    """Whether the process that claimed a job may still be running it."""
+    if token == _BOOT_TOKEN:
+        return True
+    # Same PID but another token: a previous incarnation of this process.
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """SQLite-backed job records and per-image results."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # WAL lets pollers read while a runner writes results.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner_token" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")
+
+    def create(self, file_ids: List[str], file_paths: List[str], include_intact: bool, quality: str) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, file_ids, file_paths, include_intact, quality, total,"
+                " created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    QUEUED,
+                    json.dumps(file_ids),
+                    json.dumps(file_paths),
+                    int(include_intact),
+                    quality,
+                    len(file_ids),
+                    now,
+                    now,
+                ),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["file_ids"] = json.loads(job["file_ids"])
+        job["file_paths"] = json.loads(job["file_paths"])
+        job["include_intact"] = bool(job["include_intact"])
+        return job
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running for this process; False if someone else has it."""
+        with self._lock, self._conn:
+            # Results of an interrupted earlier run are recomputed from scratch.
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner_pid = ?, owner_token = ?, completed = 0,"
+                " filtered_count = 0, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, os.getpid(), _BOOT_TOKEN, time.time(), job_id, QUEUED),
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+        return True
+
+    def add_result(self, job_id: str, position: int, payload: Dict, filtered: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, position, payload) VALUES (?, ?, ?)",
+                (job_id, position, json.dumps(payload)),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET completed = completed + 1, filtered_count = filtered_count + ?,"
+                " updated_at = ? WHERE id = ?",
+                (filtered, time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+                (FAILED if error else COMPLETED, error, now, now, job_id),
+            )
+
+    def results(self, job_id: str, start: int, limit: int, contiguous: bool = False) -> List[Tuple[int, Dict]]:
+        """
+        Up to ``limit`` (position, result) pairs from position ``start`` on.
+
+        Pages are keyed by position, not row offset: results of a running job
+        arrive out of order, so an offset would shift under a polling client.
+        With ``contiguous`` the page stops at the first position not stored
+        yet, so resuming after the last returned position never skips one.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, payload FROM job_results WHERE job_id = ? AND position >= ?"
+                " ORDER BY position LIMIT ?",
+                (job_id, start, limit),
+            ).fetchall()
+        page = []
+        for row in rows:
+            if contiguous and row["position"] != start + len(page):
+                break
+            page.append((row["position"], json.loads(row["payload"])))
+        return page
+
+    def count_queued(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+
+    def requeue_orphans(self) -> List[str]:
+        """Requeue jobs left running by a process that no longer exists; return every queued id."""
+        with self._lock, self._conn:
+            running = self._conn.execute(
+                "SELECT id, owner_pid, owner_token FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for row in running:
+                if not _owner_alive(row["owner_pid"], row["owner_token"]):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner_pid = NULL, owner_token = NULL, updated_at = ?"
+                        " WHERE id = ?",
+                        (QUEUED, time.time(), row["id"]),
+                    )
+            queued = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in queued]
+
+    def active_file_paths(self) -> Set[str]:
+        """Upload paths of queued and running jobs (the storage janitor must keep them)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT file_paths FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        return {path for row in rows for path in json.loads(row["file_paths"])}
+
+    def purge_expired(self, ttl_seconds: float) -> int:
+        """Delete finished jobs (and their results) older than the TTL."""
+        cutoff = time.time() - ttl_seconds
+        with self._lock, self._conn:
+            expired = [
+                row["id"]
+                for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+                ).fetchall()
+            ]
+            for job_id in expired:
+                self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(expired)
+
+
+class JobManager:
+    """
+    Runs inference jobs on a bounded thread pool.
+
+    Each job streams results through ``iter_inference`` and stores them as
+    they arrive, so progress and partial pages are visible while it runs.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_queued: int, result_ttl_seconds: float):
+        self.store = store
+        self.max_queued = max_queued
+        self.result_ttl_seconds = result_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="inference-job")
+
+    def submit(self, file_ids: List[str], include_intact: bool, quality: str) -> str:
+        self.store.purge_expired(self.result_ttl_seconds)
+        if self.max_queued > 0 and self.store.count_queued() >= self.max_queued:
+            raise QueueFullError(f"{self.max_queued} inference jobs are already queued")
+        file_paths = [str(path) for path in file_handler.get_file_paths(file_ids)]
+        # Queued jobs count as use, so the storage janitor keeps their uploads.
+        file_handler.touch_files(file_ids)
+        job_id = self.store.create(file_ids, file_paths, include_intact, quality)
+        self._executor.submit(self._run, job_id)
+        logger.info("Queued inference job %s (%d images, quality=%s)", job_id, len(file_ids), quality)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["finished_at"] is not None:
+            job["expires_at"] = job["finished_at"] + self.result_ttl_seconds
+            if job["expires_at"] < time.time():
+                return None
+        else:
+            job["expires_at"] = None
+        return job
+
+    def resume(self) -> None:
+        """Queue jobs that were waiting or running when the previous process stopped."""
+        purged = self.store.purge_expired(self.result_ttl_seconds)
+        job_ids = self.store.requeue_orphans()
+        if purged or job_ids:
+            logger.info("Job store: purged %d expired jobs, resuming %d", purged, len(job_ids))
+        for job_id in job_ids:
+            # Register now, not when a runner gets to it: until then the files
+            # would look unreferenced to the storage janitor.
+            job = self.store.get(job_id)
+            if job is not None:
+                self._register_files(job)
+            self._executor.submit(self._run, job_id)
+
+    @staticmethod
+    def _register_files(job: Dict) -> None:
+        """Re-register a job's uploads if this process never saw them (they live on disk)."""
+        exists = file_handler.files_exist(job["file_ids"])
+        for file_id, file_path, registered in zip(job["file_ids"], job["file_paths"], exists):
+            if not registered and Path(file_path).exists():
+                file_handler.register_file(file_id, Path(file_path))
+
+    def shutdown(self) -> None:
+        # Queued jobs stay queued in the store and are resumed on the next start.
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str) -> None:
+        if not self.store.claim(job_id):
+            return
+        job = self.store.get(job_id)
+        try:
+            self._register_files(job)
+            for position, result, filtered in iter_inference(
+                job["file_ids"],
+                include_intact=job["include_intact"],
+                quality=job["quality"],
+            ):
+                self.store.add_result(job_id, position, result.model_dump(), filtered)
+        except Exception as exc:
+            logger.exception("Inference job %s failed: %s", job_id, exc)
+            self.store.finish(job_id, error=str(getattr(exc, "detail", exc)))
+            return
+        self.store.finish(job_id)
+        logger.info("Inference job %s completed (%d images)", job_id, job["total"])
+
+
+def get_job_manager() -> JobManager:
+    """Return the shared inference job manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                JobStore(settings.JOB_DB_PATH),
+                workers=settings.JOB_WORKERS,
+                max_queued=settings.JOB_MAX_QUEUED,
+                result_ttl_seconds=settings.JOB_RESULT_TTL_SECONDS,
+            )
+    return _manager
+
+
+def shutdown_job_manager() -> None:
+    """Stop running new jobs if the manager was started."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
@@ -1,87 +1,439 @@
 """Utilities for loading YOLO models used by the inference service."""
 from __future__ import annotations
 
+import hashlib
+import logging
+import math
+import os
+import shutil
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 
+import cv2
+import numpy as np
 from ultralytics import YOLO
 
 from apps.api.core.config import settings
+from apps.api.core.metrics import MODEL_LOADED, stage_timer
+from apps.api.services.ml.registry import ModelRegistry, ModelVersion
+
+logger = logging.getLogger(__name__)
+
+# Ultralytics export format for each non-torch engine
+_EXPORT_FORMATS = {
+    "onnxruntime": "onnx",
+    "openvino": "openvino",
+}
+
+# Serving modes: two detectors chained, or one detector trained on "{part}_{damage}" classes
+INFERENCE_MODES = ("two_stage", "combined")
+
+# Per-request quality tiers; each maps to a scale of the per-stage input size
+QUALITY_TIERS = ("fast", "standard", "precise")
+
+# YOLO input sizes must be a multiple of the model stride
+_IMGSZ_STRIDE = 32
+
+# Damage suffixes of the combined classes built by tools/label_fusion
+COMBINED_DAMAGE_TYPES = (
+    "dent",
+    "scratch",
+    "cracked",
+    "broken_part",
+    "missing_part",
+    "paint_chip",
+    "flaking",
+    "corrosion",
+    "intact",
+    "other_damage",
+)
+
+# A file path, or an already-decoded BGR array / preprocessed tensor that is
+# handed to Ultralytics untouched.
+ImageSource = Union[str, Path, np.ndarray]
 
 
 class ModelNotFoundError(RuntimeError):
     """Raised when a configured model file cannot be loaded."""
 
 
+class ImageDecodeError(RuntimeError):
+    """Raised when an uploaded image cannot be decoded."""
+
+
+def weights_hash(path: Path) -> str:
+    """Return the SHA-256 of a weights file (or of every file in an exported model dir)."""
+    digest = hashlib.sha256()
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for file_path in files:
+        if path.is_dir():
+            digest.update(file_path.relative_to(path).as_posix().encode())
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _weights_hash_cached(path: str, mtime_ns: int, size: int) -> str:
+    return weights_hash(Path(path))
+
+
+def inference_mode() -> str:
+    """Return the configured serving mode, validated against INFERENCE_MODES."""
+    mode = settings.INFERENCE_MODE.strip().lower()
+    if mode not in INFERENCE_MODES:
+        raise ValueError(
+            f"Unsupported INFERENCE_MODE '{settings.INFERENCE_MODE}'. "
+            f"Use one of: {', '.join(INFERENCE_MODES)}"
+        )
+    return mode
+
+
+def resolve_imgsz(stage: str, quality: str = "standard") -> int:
+    """Return the input size for a stage ("part", "damage" or "combined") at a quality tier."""
+    base = {
+        "part": settings.PART_IMGSZ,
+        "damage": settings.DAMAGE_IMGSZ,
+        "combined": settings.COMBINED_IMGSZ,
+    }[stage]
+    scale = {
+        "fast": settings.QUALITY_FAST_SCALE,
+        "standard": 1.0,
+        "precise": settings.QUALITY_PRECISE_SCALE,
+    }.get(quality)
+    if scale is None:
+        raise ValueError(f"Unsupported quality tier '{quality}'. Use one of: {', '.join(QUALITY_TIERS)}")
+    return max(_IMGSZ_STRIDE, int(round(base * scale / _IMGSZ_STRIDE)) * _IMGSZ_STRIDE)
+
+
+def region_imgsz(imgsz: int, fraction: float) -> int:
+    """
+    Input size for a region spanning ``fraction`` of the frame's longest side.
+
+    Keeps the pixel scale the full frame gets at ``imgsz`` (rounded up to
+    the model stride), so a crop is never upscaled past the full-frame pass.
+    """
+    size = math.ceil(imgsz * fraction / _IMGSZ_STRIDE) * _IMGSZ_STRIDE
+    return min(imgsz, max(_IMGSZ_STRIDE, size))
+
+
+def model_path(name: str) -> Path:
+    """Return the configured weights path of a detector ("part", "damage" or "combined")."""
+    return {
+        "part": settings.PART_MODEL_PATH,
+        "damage": settings.DAMAGE_MODEL_PATH,
+        "combined": settings.COMBINED_MODEL_PATH,
+    }[name]
+
+
+def active_model_names() -> Tuple[str, ...]:
+    """Return the detectors the configured mode serves."""
+    if inference_mode() == "combined":
+        return ("combined",)
+    return ("part", "damage")
+
+
+def file_weights_hash(name: str) -> str:
+    """Return the hash of a detector's weights on disk, re-hashing only when the file changes."""
+    path = model_path(name)
+    if not path.exists():
+        raise ModelNotFoundError(f"Model weights not found: {path}")
+    stat = path.stat()
+    return _weights_hash_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def model_fingerprint() -> Tuple[str, ...]:
+    """Return the weights hashes of the active models as currently served."""
+    fingerprint = []
+    for name in active_model_names():
+        # Key by what is loaded, not by the file, so a pending reload never
+        # stores old-model results under the new weights' key.
+        version = model_registry.peek(name)
+        fingerprint.append(version.weights_hash if version is not None else file_weights_hash(name))
+    return tuple(fingerprint)
+
+
+def _export_artifact_name(path: Path, export_format: str) -> str:
+    if export_format == "openvino":
+        return f"{path.stem}_openvino_model"
+    return f"{path.stem}.{export_format}"
+
+
+def _export_model(path: Path, engine: str) -> Path:
+    """Export .pt weights for a runtime engine, reusing a cached export when present."""
+    export_format = _EXPORT_FORMATS[engine]
+    cache_dir = settings.MODEL_EXPORT_DIR / f"{path.stem}-{weights_hash(path)[:16]}"
+    artifact = cache_dir / _export_artifact_name(path, export_format)
+    if artifact.exists():
+        return artifact
+
+    # Ultralytics writes the export next to the weights, so export from a private
+    # copy and move the finished directory into place in one rename.
+    staging_dir = cache_dir.with_name(f"{cache_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+    try:
+        staged_weights = staging_dir / path.name
+        shutil.copy2(path, staged_weights)
+        logger.info("Exporting %s for %s", path, engine)
+        YOLO(str(staged_weights)).export(format=export_format, dynamic=True, half=False)
+        staged_weights.unlink()
+        try:
+            staging_dir.rename(cache_dir)
+        except OSError:
+            # Another worker finished the same export first.
+            if not artifact.exists():
+                raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return artifact
+
+
 def _load_model(path: Path) -> YOLO:
     if not path.exists():
         raise ModelNotFoundError(f"Model weights not found: {path}")
-    return YOLO(str(path))
+    engine = settings.ML_ENGINE.strip().lower()
+    if engine == "torch" or path.suffix != ".pt":
+        # Non-.pt paths are already exported artifacts (e.g. *.onnx, *_openvino_model/).
+        return YOLO(str(path), task="detect")
+    if engine not in _EXPORT_FORMATS:
+        raise ValueError(
+            f"Unsupported ML_ENGINE '{settings.ML_ENGINE}'. "
+            f"Use one of: torch, {', '.join(_EXPORT_FORMATS)}"
+        )
+    return YOLO(str(_export_model(path, engine)), task="detect")
+
+
+def _load_version(name: str) -> ModelVersion:
+    path = model_path(name)
+    digest = file_weights_hash(name)
+    model = _load_model(path)
+    version = ModelVersion(
+        name=name,
+        path=path,
+        weights_hash=digest,
+        model=model,
+        labels=_build_label_table(model.names),
+    )
+    MODEL_LOADED.labels(model=name).set(1)
+    logger.info("Loaded %s detector %s (weights %s)", name, path, digest[:12])
+    return version
+
+
+# Current detector versions; see registry.ModelRegistry
+model_registry = ModelRegistry(_load_version)
 
 
-@lru_cache(maxsize=1)
 def get_part_detector() -> YOLO:
-    """Return the cached Stage 1 part detector."""
-    return _load_model(settings.PART_MODEL_PATH)
+    """Return the current Stage 1 part detector."""
+    return model_registry.get("part").model
 
 
-@lru_cache(maxsize=1)
 def get_damage_detector() -> YOLO:
-    """Return the cached Stage 2 damage detector."""
-    return _load_model(settings.DAMAGE_MODEL_PATH)
+    """Return the current Stage 2 damage detector."""
+    return model_registry.get("damage").model
+
+
+def get_combined_detector() -> YOLO:
+    """Return the current single-pass part+damage detector."""
+    return model_registry.get("combined").model
+
+
+def active_detector_loaders() -> Dict[str, Callable[[], YOLO]]:
+    """Return the loaders for the models the configured mode serves, by name."""
+    loaders = {"part": get_part_detector, "damage": get_damage_detector, "combined": get_combined_detector}
+    return {name: loaders[name] for name in active_model_names()}
+
+
+def record_served_weights(hashes: Mapping[str, str]) -> None:
+    """Register weights served by inference worker processes (no model in this process)."""
+    model_registry.swap(
+        {name: ModelVersion(name=name, path=model_path(name), weights_hash=digest) for name, digest in hashes.items()}
+    )
+
+
+def canonicalize_label(label: str) -> str:
+    return label.strip().lower().replace(" ", "_").replace("-", "_")
+
 
+def _build_label_table(names: Mapping[int, str]) -> Tuple[str, ...]:
+    """Index canonical labels by class id so postprocessing is a list lookup."""
+    if not names:
+        return ()
+    table = [str(cls_id) for cls_id in range(max(names) + 1)]
+    for cls_id, label in names.items():
+        table[cls_id] = canonicalize_label(label)
+    return tuple(table)
 
-def _format_prediction(result: Any, conf_threshold: float) -> List[Dict]:
-    formatted: List[Dict] = []
+
+@lru_cache(maxsize=256)
+def split_combined_label(label: str) -> Tuple[str, str]:
+    """Split a canonical ``{part}_{damage}`` class name into (part, damage_type)."""
+    # Longest suffix first so "broken_part" wins over any shorter overlap.
+    for damage_type in sorted(COMBINED_DAMAGE_TYPES, key=len, reverse=True):
+        suffix = f"_{damage_type}"
+        if label.endswith(suffix) and len(label) > len(suffix):
+            return label[: -len(suffix)], damage_type
+    part, sep, damage_type = label.rpartition("_")
+    if not sep:
+        return label, "intact"
+    return part, damage_type
+
+
+def decode_image(image_path: Path) -> np.ndarray:
+    """Decode an image file into the BGR array Ultralytics would build itself."""
+    image = cv2.imdecode(np.fromfile(str(image_path), np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ImageDecodeError(f"Could not decode image: {image_path}")
+    return image
+
+
+def _as_source(image: ImageSource) -> Any:
+    if isinstance(image, (str, Path)):
+        return str(image)
+    return image
+
+
+def _to_numpy(values: Any) -> np.ndarray:
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def _format_prediction(result: Any, conf_threshold: float, labels: Sequence[str]) -> List[Dict]:
     boxes = getattr(result, "boxes", None)
-    names = getattr(result, "names", {})
-    if boxes is None:
-        return formatted
-
-    for box in boxes:
-        conf = float(box.conf)
-        if conf < conf_threshold:
-            continue
-        cls_id = int(box.cls)
-        label = names.get(cls_id, str(cls_id))
-        xyxy = [float(v) for v in box.xyxy[0].tolist()]
-        formatted.append(
-            {
-                "label": label,
-                "confidence": conf,
-                "bbox": xyxy,
-            }
+    if boxes is None or len(boxes) == 0:
+        return []
+
+    # One device-to-host copy per field, then threshold with a mask.
+    conf = _to_numpy(boxes.conf).reshape(-1)
+    keep = conf >= conf_threshold
+    if not keep.any():
+        return []
+    cls_ids = _to_numpy(boxes.cls).reshape(-1)[keep].astype(np.int64).tolist()
+    xyxy = _to_numpy(boxes.xyxy).reshape(-1, 4)[keep].tolist()
+
+    num_labels = len(labels)
+    return [
+        {
+            "label": labels[cls_id] if 0 <= cls_id < num_labels else str(cls_id),
+            "confidence": confidence,
+            "bbox": bbox,
+        }
+        for cls_id, confidence, bbox in zip(cls_ids, conf[keep].tolist(), xyxy)
+    ]
+
+
+def _predict(
+    version: ModelVersion,
+    source: Any,
+    conf_threshold: float,
+    **kwargs: Any,
+) -> List[List[Dict]]:
+    # Ultralytics predictors keep per-call state on the model object, so
+    # threads sharing one version take turns; different models still overlap.
+    with version.predict_lock:
+        results = version.model.predict(
+            source=source,
+            conf=conf_threshold,
+            device=settings.ML_DEVICE,
+            verbose=False,
+            **kwargs,
         )
-    return formatted
+        return [_format_prediction(result, conf_threshold, version.labels) for result in results]
+
+
+def _predict_batch(
+    version: ModelVersion,
+    images: Sequence[ImageSource],
+    conf_threshold: float,
+    **kwargs: Any,
+) -> List[List[Dict]]:
+    if not images:
+        return []
+    sources = [_as_source(image) for image in images]
+    return _predict(version, sources, conf_threshold, batch=len(sources), **kwargs)
 
 
-def detect_parts(image_path: Path) -> List[Dict]:
+def detect_parts(image: ImageSource, imgsz: Optional[int] = None) -> List[Dict]:
     """Run Stage 1 detector on an image and return part predictions."""
-    model = get_part_detector()
-    results = model.predict(
-        source=str(image_path),
-        conf=settings.PART_CONF_THRESHOLD,
-        device=settings.ML_DEVICE,
-        verbose=False,
-    )
     detections: List[Dict] = []
-    for result in results:
-        detections.extend(_format_prediction(result, settings.PART_CONF_THRESHOLD))
+    version = model_registry.get("part")
+    with stage_timer("part_detection"):
+        batches = _predict(
+            version,
+            _as_source(image),
+            settings.PART_CONF_THRESHOLD,
+            imgsz=imgsz or settings.PART_IMGSZ,
+        )
+    for formatted in batches:
+        detections.extend(formatted)
     return detections
 
 
-def detect_damage(image_path: Path) -> List[Dict]:
+def detect_damage(image: ImageSource, imgsz: Optional[int] = None) -> List[Dict]:
     """Run Stage 2 detector on an image and return damage predictions."""
-    model = get_damage_detector()
-    results = model.predict(
-        source=str(image_path),
-        conf=settings.DAMAGE_CONF_THRESHOLD,
-        device=settings.ML_DEVICE,
-        verbose=False,
-    )
     detections: List[Dict] = []
-    for result in results:
-        detections.extend(_format_prediction(result, settings.DAMAGE_CONF_THRESHOLD))
+    version = model_registry.get("damage")
+    with stage_timer("damage_detection"):
+        batches = _predict(
+            version,
+            _as_source(image),
+            settings.DAMAGE_CONF_THRESHOLD,
+            imgsz=imgsz or settings.DAMAGE_IMGSZ,
+        )
+    for formatted in batches:
+        detections.extend(formatted)
     return detections
 
+
+def detect_parts_batch(images: Sequence[ImageSource], imgsz: Optional[int] = None) -> List[List[Dict]]:
+    """Run Stage 1 detector on several images in one call; one list per image."""
+    version = model_registry.get("part")
+    with stage_timer("part_detection"):
+        return _predict_batch(
+            version,
+            images,
+            settings.PART_CONF_THRESHOLD,
+            imgsz=imgsz or settings.PART_IMGSZ,
+        )
+
+
+def detect_damage_batch(images: Sequence[ImageSource], imgsz: Optional[int] = None) -> List[List[Dict]]:
+    """Run Stage 2 detector on several images in one call; one list per image."""
+    version = model_registry.get("damage")
+    with stage_timer("damage_detection"):
+        return _predict_batch(
+            version,
+            images,
+            settings.DAMAGE_CONF_THRESHOLD,
+            imgsz=imgsz or settings.DAMAGE_IMGSZ,
+        )
+
+
+def _split_combined(predictions: List[Dict]) -> List[Dict]:
+    for pred in predictions:
+        pred["part"], pred["damage_type"] = split_combined_label(pred["label"])
+    return predictions
+
+
+def detect_combined_batch(images: Sequence[ImageSource], imgsz: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Run the combined detector on several images; one list per image.
+
+    Each prediction carries ``part`` and ``damage_type`` split from its class
+    name. NMS is class-agnostic so one region yields one part/damage pair, as
+    with the two-stage matcher.
+    """
+    version = model_registry.get("combined")
+    with stage_timer("combined_detection"):
+        batches = _predict_batch(
+            version,
+            images,
+            settings.COMBINED_CONF_THRESHOLD,
+            imgsz=imgsz or settings.COMBINED_IMGSZ,
+            agnostic_nms=True,
+        )
+    return [_split_combined(predictions) for predictions in batches]
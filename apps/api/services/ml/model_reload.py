@@ -0,0 +1,143 @@
+"""Hot reload of detector weights: admin-triggered or by watching the weight files."""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from apps.api.core.config import settings
+from apps.api.services.ml.model_loader import (
+    active_model_names,
+    file_weights_hash,
+    model_path,
+    model_registry,
+    record_served_weights,
+)
+from apps.api.services.ml.warmup import warm_version
+from apps.api.services.ml.worker_pool import get_worker_pool, restart_worker_pool
+
+logger = logging.getLogger(__name__)
+
+_reload_lock = threading.Lock()
+_watcher: Optional["ModelFileWatcher"] = None
+
+
+def reload_models(force: bool = False) -> Dict[str, Dict]:
+    """
+    Load, warm and swap in any active detector whose weights changed on disk.
+
+    Blocks until the new versions serve; call it off the event loop. Returns
+    the outcome per detector (``reloaded`` or ``unchanged``) with hashes.
+    """
+    with _reload_lock:
+        names = active_model_names()
+        hashes = {name: file_weights_hash(name) for name in names}
+        previous = {name: model_registry.peek(name) for name in names}
+        changed = [
+            name
+            for name in names
+            if force or previous[name] is None or previous[name].weights_hash != hashes[name]
+        ]
+
+        if changed:
+            if get_worker_pool() is not None:
+                # The workers hold the models: bring up a pool on the new
+                # weights, then retire the old one.
+                restart_worker_pool()
+                record_served_weights(hashes)
+            else:
+                versions = {name: model_registry.load(name) for name in changed}
+                for version in versions.values():
+                    warm_version(version)
+                model_registry.swap(versions)
+                hashes.update({name: version.weights_hash for name, version in versions.items()})
+
+        outcome = {}
+        for name in names:
+            old = previous[name]
+            outcome[name] = {
+                "status": "reloaded" if name in changed else "unchanged",
+                "path": str(model_path(name)),
+                "previous_hash": old.weights_hash if old is not None else None,
+                "weights_hash": hashes[name],
+            }
+            if name in changed:
+                logger.info("Reloaded %s detector (weights %s)", name, hashes[name][:12])
+        return outcome
+
+
+def model_versions() -> Dict[str, Dict]:
+    """Describe the detector versions currently serving."""
+    versions = {}
+    for name, version in model_registry.snapshot().items():
+        versions[name] = {
+            "path": str(version.path),
+            "weights_hash": version.weights_hash,
+            "loaded_at": version.loaded_at,
+            "in_process": version.model is not None,
+        }
+    return versions
+
+
+class ModelFileWatcher:
+    """Polls the active weight files and reloads when they change."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval = max(0.5, interval_seconds)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _snapshot(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        snapshot = {}
+        for name in active_model_names():
+            path = model_path(name)
+            try:
+                stat = path.stat()
+            except OSError:
+                snapshot[str(path)] = None
+                continue
+            snapshot[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _run(self) -> None:
+        last = self._snapshot()
+        while not self._stop.wait(self.interval):
+            current = self._snapshot()
+            if current == last:
+                continue
+            # Reload only once the files have stopped changing for a full
+            # interval, so a half-copied file is never loaded.
+            if self._stop.wait(self.interval) or self._snapshot() != current:
+                continue
+            if any(stat is None for stat in current.values()):
+                logger.warning("Model watcher: weights missing, keeping current models")
+                continue
+            try:
+                reload_models()
+            except Exception as exc:
+                logger.exception("Model watcher reload failed: %s", exc)
+            last = current
+
+
+def start_model_watcher() -> None:
+    """Start watching the active weight files when MODEL_WATCH_ENABLED is set."""
+    global _watcher
+    if not settings.MODEL_WATCH_ENABLED or _watcher is not None:
+        return
+    _watcher = ModelFileWatcher(settings.MODEL_WATCH_INTERVAL_SECONDS)
+    _watcher.start()
+    logger.info("Watching model weights every %.1fs", _watcher.interval)
+
+
+def stop_model_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
@@ -0,0 +1,91 @@
+"""Upload-time image normalization into memory-mappable arrays for inference."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from apps.api.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientations that rotate by 90/270 degrees (width and height swap)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+def artifact_paths(image_path: Path) -> Tuple[Path, Path]:
+    """Return the (array, metadata) paths stored next to an upload."""
+    return image_path.with_suffix(".prep.npy"), image_path.with_suffix(".prep.json")
+
+
+def target_side() -> int:
+    """Longest side kept by preprocessing: the largest input size any quality tier uses."""
+    if settings.UPLOAD_PREPROCESS_MAX_SIDE > 0:
+        return settings.UPLOAD_PREPROCESS_MAX_SIDE
+    base = max(settings.PART_IMGSZ, settings.DAMAGE_IMGSZ, settings.COMBINED_IMGSZ)
+    return int(base * max(1.0, settings.QUALITY_FAST_SCALE, settings.QUALITY_PRECISE_SCALE))
+
+
+def preprocess_upload(image_path: Path) -> None:
+    """
+    Orient and downscale an upload once and store it as a BGR uint8 ``.npy``.
+
+    Images keep their aspect ratio (no letterbox): each quality tier runs at
+    its own input size and Ultralytics letterboxes the smaller array cheaply.
+    The metadata records the scale back to the oriented original so boxes can
+    be reported in original pixel coordinates.
+    """
+    max_side = target_side()
+    with Image.open(image_path) as image:
+        orientation = image.getexif().get(_EXIF_ORIENTATION_TAG, 1)
+        width, height = image.size
+        if orientation in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale.
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        array = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+    scale = max_side / max(array.shape[:2])
+    if scale < 1.0:
+        new_size = (max(1, round(array.shape[1] * scale)), max(1, round(array.shape[0] * scale)))
+        array = cv2.resize(array, new_size, interpolation=cv2.INTER_AREA)
+    array = np.ascontiguousarray(array)
+
+    meta = {
+        "orig_size": [width, height],
+        "scale_x": array.shape[1] / width,
+        "scale_y": array.shape[0] / height,
+    }
+    array_path, meta_path = artifact_paths(image_path)
+    tmp_array = array_path.with_name(f"{array_path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_array, array)
+    meta_path.write_text(json.dumps(meta))
+    # The array is published last: its presence means the metadata is complete.
+    os.replace(tmp_array, array_path)
+
+
+def load_preprocessed(image_path: Path) -> Optional[Tuple[np.ndarray, float, float]]:
+    """Return (memory-mapped BGR array, scale_x, scale_y), or None without an artifact."""
+    array_path, meta_path = artifact_paths(Path(image_path))
+    if not array_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+        array = np.load(array_path, mmap_mode="r")
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable preprocessed artifact for %s: %s", image_path, exc)
+        return None
+    return array, meta["scale_x"], meta["scale_y"]
+
+
+def remove_artifacts(image_path: Path) -> None:
+    for path in artifact_paths(image_path):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,68 @@
+"""Versioned registry of loaded detectors with atomic swaps."""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """One loaded weights version of a named detector."""
+
+    name: str
+    path: Path
+    weights_hash: str
+    # None when the model is served by inference worker processes instead
+    model: Any = None
+    labels: Tuple[str, ...] = ()
+    loaded_at: float = field(default_factory=time.time)
+    # Serializes predict calls on ``model`` (Ultralytics predictors are not thread-safe)
+    predict_lock: threading.Lock = field(default_factory=threading.Lock, compare=False, repr=False)
+
+
+class ModelRegistry:
+    """
+    Holds the current version of each detector by name.
+
+    Callers take one ``ModelVersion`` and use its model and labels together,
+    so a swap never mixes weights and label tables. Swaps replace the whole
+    mapping in one assignment; requests already holding the old version keep
+    running on it until they drop their reference.
+    """
+
+    def __init__(self, load_version: Callable[[str], ModelVersion]):
+        self._load_version = load_version
+        self._versions: Dict[str, ModelVersion] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ModelVersion:
+        """Return the current version, loading it on first use."""
+        version = self._versions.get(name)
+        if version is None or version.model is None:
+            with self._lock:
+                version = self._versions.get(name)
+                if version is None or version.model is None:
+                    version = self._load_version(name)
+                    self._versions = {**self._versions, name: version}
+        return version
+
+    def peek(self, name: str) -> Optional[ModelVersion]:
+        """Return the current version without loading anything."""
+        return self._versions.get(name)
+
+    def load(self, name: str) -> ModelVersion:
+        """Load a fresh version without making it current."""
+        return self._load_version(name)
+
+    def swap(self, versions: Dict[str, ModelVersion]) -> Dict[str, Optional[ModelVersion]]:
+        """Make ``versions`` current in one step and return the versions they replace."""
+        with self._lock:
+            previous = {name: self._versions.get(name) for name in versions}
+            self._versions = {**self._versions, **versions}
+        return previous
+
+    def snapshot(self) -> Dict[str, ModelVersion]:
+        return dict(self._versions)
@@ -0,0 +1,140 @@
+"""Content-addressed cache of per-image inference results."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from apps.api.core.config import settings
+from apps.api.core.metrics import RESULT_CACHE_LOOKUPS
+from apps.api.models.detection import Detection
+from apps.api.services.ml.model_loader import model_fingerprint, resolve_imgsz
+from apps.api.services.ml.preprocess import target_side
+
+logger = logging.getLogger(__name__)
+
+_cache: Optional["InferenceResultCache"] = None
+_cache_lock = threading.Lock()
+
+
+def _cascade_signature() -> Optional[List]:
+    if not settings.DAMAGE_CASCADE_ENABLED:
+        return None
+    return [
+        settings.DAMAGE_CASCADE_PADDING,
+        settings.DAMAGE_CASCADE_MAX_AREA_RATIO,
+        settings.DAMAGE_CASCADE_MAX_CROPS,
+    ]
+
+
+def result_cache_key(image_hash: str, quality: str = "standard") -> str:
+    """Key an image's detections by its bytes, the model weights, the thresholds and the quality tier."""
+    material = json.dumps(
+        [
+            image_hash,
+            quality,
+            [resolve_imgsz(stage, quality) for stage in ("part", "damage", "combined")],
+            settings.INFERENCE_MODE,
+            *model_fingerprint(),
+            settings.COMBINED_CONF_THRESHOLD,
+            settings.PART_CONF_THRESHOLD,
+            settings.DAMAGE_CONF_THRESHOLD,
+            settings.DAMAGE_MATCH_MIN_IOU,
+            _cascade_signature(),
+            target_side() if settings.UPLOAD_PREPROCESS_ENABLED else None,
+        ]
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class InferenceResultCache:
+    """
+    Two-tier cache of unfiltered detections.
+
+    A bounded in-memory LRU sits in front of an optional directory of JSON
+    files; disk hits are promoted back into memory.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[Path] = None):
+        self.max_entries = max(0, max_entries)
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[List[Detection]]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                RESULT_CACHE_LOOKUPS.labels(result="memory_hit").inc()
+        if payload is None:
+            payload = self._read_disk(key)
+            with self._lock:
+                if payload is None:
+                    RESULT_CACHE_LOOKUPS.labels(result="miss").inc()
+                    return None
+                RESULT_CACHE_LOOKUPS.labels(result="disk_hit").inc()
+                self._remember(key, payload)
+        return [Detection(**detection) for detection in payload]
+
+    def put(self, key: str, detections: List[Detection]) -> None:
+        payload = [detection.model_dump() for detection in detections]
+        with self._lock:
+            self._remember(key, payload)
+        self._write_disk(key, payload)
+
+    def _remember(self, key: str, payload: List[Dict]) -> None:
+        if self.max_entries == 0:
+            return
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[List[Dict]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, exc)
+            return None
+
+    def _write_disk(self, key: str, payload: List[Dict]) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(payload))
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning("Could not write cache entry %s: %s", path, exc)
+
+
+def get_result_cache() -> Optional[InferenceResultCache]:
+    """Return the shared result cache, or None when caching is disabled."""
+    global _cache
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = InferenceResultCache(
+                max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+                disk_dir=settings.RESULT_CACHE_DIR,
+            )
+    return _cache
@@ -0,0 +1,158 @@
+"""Micro-batching scheduler that shares YOLO predict calls across requests."""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from apps.api.core.metrics import SCHEDULER_BATCH_SIZE, SCHEDULER_QUEUE_DEPTH
+from apps.api.models.detection import Detection
+
+logger = logging.getLogger(__name__)
+
+# (image paths, quality tier) -> detections per image
+BatchRunner = Callable[[List[Path], str], List[List[Detection]]]
+
+
+@dataclass
+class _Job:
+    image_path: Path
+    quality: str = "standard"
+    future: "Future[List[Detection]]" = field(default_factory=Future)
+
+
+class InferenceScheduler:
+    """
+    Gathers images submitted by concurrent requests into batches.
+
+    A single dispatcher thread waits for the first queued image, keeps
+    collecting for up to ``max_wait_ms`` (or until ``max_batch_size`` images
+    are queued) and runs the batch through ``run_batch``. Each caller gets a
+    future that resolves to the detections for its own image.
+
+    Up to ``max_concurrent_batches`` batches run at once (e.g. one per
+    inference worker process); while all are busy, new images keep queueing
+    and form the next, larger batch. Images of different quality tiers run
+    at different input sizes, so a collected batch is split per tier.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_concurrent_batches: int = 1,
+    ):
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_batches)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, image_path: Path, quality: str = "standard") -> "Future[List[Detection]]":
+        """Queue one image and return a future for its detections."""
+        self._ensure_started()
+        job = _Job(image_path=image_path, quality=quality)
+        # Set explicitly rather than via a callback so the gauge is also
+        # exported in Prometheus multiprocess mode.
+        SCHEDULER_QUEUE_DEPTH.inc()
+        self._queue.put(job)
+        return job.future
+
+    def shutdown(self) -> None:
+        """Stop the dispatcher after the batches already queued have run."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_batches,
+                    thread_name_prefix="inference-batch",
+                )
+                self._thread = threading.Thread(
+                    target=self._dispatch_loop,
+                    name="inference-scheduler",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _collect_batch(self, first: _Job) -> List[Optional[_Job]]:
+        batch: List[Optional[_Job]] = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(job)
+            if job is None:
+                break
+        return batch
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # Wait for a free slot before collecting, so the batch keeps
+            # growing while every slot is busy.
+            self._slots.acquire()
+            batch = self._collect_batch(first)
+            stop = batch[-1] is None
+            jobs = [job for job in batch if job is not None]
+            SCHEDULER_QUEUE_DEPTH.dec(len(jobs))
+            self._executor.submit(self._run_jobs, jobs)
+            if stop:
+                return
+
+    def _run_jobs(self, jobs: List[_Job]) -> None:
+        try:
+            self._execute(jobs)
+        finally:
+            self._slots.release()
+
+    def _execute(self, jobs: List[_Job]) -> None:
+        jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+        by_quality: Dict[str, List[_Job]] = {}
+        for job in jobs:
+            by_quality.setdefault(job.quality, []).append(job)
+        for quality, tier_jobs in by_quality.items():
+            self._execute_tier(tier_jobs, quality)
+
+    def _execute_tier(self, jobs: List[_Job], quality: str) -> None:
+        SCHEDULER_BATCH_SIZE.observe(len(jobs))
+        try:
+            results = self._run_batch([job.image_path for job in jobs], quality)
+        except Exception as exc:
+            if len(jobs) == 1:
+                jobs[0].future.set_exception(exc)
+                return
+            # One bad image should not fail every request that shared the batch.
+            logger.warning("Batch of %d images failed (%s); retrying one by one", len(jobs), exc)
+            for job in jobs:
+                try:
+                    job.future.set_result(self._run_batch([job.image_path], quality)[0])
+                except Exception as single_exc:
+                    job.future.set_exception(single_exc)
+            return
+        for job, detections in zip(jobs, results):
+            job.future.set_result(detections)
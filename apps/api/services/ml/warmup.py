@@ -0,0 +1,138 @@
+"""Model preloading, warmup passes and readiness state for the ML service."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from apps.api.core.config import settings
+from apps.api.core.metrics import MODEL_LOADED
+from apps.api.services.ml.model_loader import (
+    active_detector_loaders,
+    active_model_names,
+    detect_combined_batch,
+    detect_damage,
+    detect_parts,
+    file_weights_hash,
+    inference_mode,
+    record_served_weights,
+)
+from apps.api.services.ml.registry import ModelVersion
+from apps.api.services.ml.worker_pool import get_worker_pool
+
+logger = logging.getLogger(__name__)
+
+NOT_READY = "not_ready"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+_state_lock = threading.Lock()
+_state: Dict = {
+    "status": NOT_READY,
+    "timings_ms": {},
+    "error": None,
+}
+
+
+def _set_state(status: str, error: Optional[str] = None) -> None:
+    with _state_lock:
+        _state["status"] = status
+        _state["error"] = error
+
+
+def _record(name: str, start_time: float) -> None:
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    with _state_lock:
+        _state["timings_ms"][name] = round(elapsed_ms, 2)
+    logger.info("Warmup step %s took %.2fms", name, elapsed_ms)
+
+
+def get_readiness() -> Dict:
+    """Return a copy of the current readiness state."""
+    with _state_lock:
+        return {
+            "status": _state["status"],
+            "timings_ms": dict(_state["timings_ms"]),
+            "error": _state["error"],
+        }
+
+
+def is_ready() -> bool:
+    with _state_lock:
+        return _state["status"] == READY
+
+
+def mark_ready() -> None:
+    """Report ready without warming (models keep loading lazily)."""
+    _set_state(READY)
+
+
+def _warmup_image(imgsz: int) -> np.ndarray:
+    # Mid-gray noise so the forward pass is not trivially empty.
+    rng = np.random.default_rng(0)
+    return rng.integers(64, 192, size=(imgsz, imgsz, 3), dtype=np.uint8)
+
+
+def warm_version(version: ModelVersion, passes: Optional[int] = None, imgsz: Optional[int] = None) -> None:
+    """Run warmup passes on a loaded version before it starts serving."""
+    passes = settings.MODEL_WARMUP_PASSES if passes is None else passes
+    image = _warmup_image(imgsz or settings.MODEL_WARMUP_IMGSZ)
+    for _ in range(passes):
+        with version.predict_lock:
+            version.model.predict(source=image, device=settings.ML_DEVICE, verbose=False)
+
+
+def run_warmup_passes(passes: int, imgsz: int) -> None:
+    """Run synthetic images through the active detectors loaded in this process."""
+    image = _warmup_image(imgsz)
+    combined = inference_mode() == "combined"
+    for idx in range(passes):
+        start_time = time.perf_counter()
+        if combined:
+            detect_combined_batch([image])
+        else:
+            detect_parts(image)
+            detect_damage(image)
+        _record(f"warmup_pass_{idx + 1}", start_time)
+
+
+def run_warmup(passes: Optional[int] = None, imgsz: Optional[int] = None) -> None:
+    """
+    Preload the active detectors and run warmup passes on a synthetic image.
+
+    Blocks until done; call it off the event loop. Readiness flips to
+    ``ready`` only after every step succeeds.
+    """
+    passes = settings.MODEL_WARMUP_PASSES if passes is None else passes
+    imgsz = imgsz or settings.MODEL_WARMUP_IMGSZ
+    _set_state(WARMING)
+    total_start = time.perf_counter()
+    try:
+        pool = get_worker_pool()
+        if pool is not None:
+            # Worker initializers load the models and run the warmup passes
+            # (MODEL_WARMUP_PASSES); the API process never runs them.
+            hashes = {name: file_weights_hash(name) for name in active_model_names()}
+            start_time = time.perf_counter()
+            pool.start()
+            _record("worker_pool_start", start_time)
+            record_served_weights(hashes)
+            for name in hashes:
+                MODEL_LOADED.labels(model=name).set(1)
+        else:
+            for name, load in active_detector_loaders().items():
+                start_time = time.perf_counter()
+                load()
+                _record(f"{name}_model_load", start_time)
+            run_warmup_passes(passes, imgsz)
+    except Exception as exc:
+        logger.exception("Model warmup failed: %s", exc)
+        _set_state(FAILED, str(exc))
+        return
+
+    _record("total", total_start)
+    _set_state(READY)
@@ -0,0 +1,223 @@
+"""Process pool that runs inference in workers with preloaded models."""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from apps.api.core.config import settings
+from apps.api.models.detection import Detection
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional["InferenceWorkerPool"] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Pin Torch threading, then load and warm the active detectors once per worker process."""
+    try:
+        import torch
+
+        from apps.api.services.ml.model_loader import ModelNotFoundError, active_detector_loaders
+        from apps.api.services.ml.warmup import run_warmup_passes
+
+        torch.set_num_threads(torch_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # already fixed once any parallel work has run
+        try:
+            for load in active_detector_loaders().values():
+                load()
+        except ModelNotFoundError as exc:
+            # Let jobs surface the error instead of breaking the whole pool.
+            logger.error("Worker %d could not preload models: %s", os.getpid(), exc)
+            return
+        # Runs before the worker takes any job, also for pools rebuilt after
+        # a crash or a hot reload.
+        if settings.MODEL_WARMUP_ENABLED:
+            run_warmup_passes(settings.MODEL_WARMUP_PASSES, settings.MODEL_WARMUP_IMGSZ)
+    except Exception:
+        # The parent only sees BrokenProcessPool; log the actual cause here.
+        logger.exception("Inference worker %d failed to start", os.getpid())
+        raise
+
+
+def _run_job(image_paths: List[str], quality: str) -> List[List[Dict]]:
+    from apps.api.services.ml.inference import _run_images
+
+    batch_detections = _run_images([Path(path) for path in image_paths], quality)
+    return [[detection.model_dump() for detection in detections] for detections in batch_detections]
+
+
+def _ping(hold_seconds: float = 0.0) -> int:
+    time.sleep(hold_seconds)
+    return os.getpid()
+
+
+def resolve_worker_count() -> int:
+    """Number of worker processes for INFERENCE_WORKERS (-1 sizes to the core count)."""
+    if settings.INFERENCE_WORKERS >= 0:
+        return settings.INFERENCE_WORKERS
+    threads = max(1, settings.INFERENCE_WORKER_THREADS)
+    return max(1, (os.cpu_count() or 1) // threads)
+
+
+class InferenceWorkerPool:
+    """Dispatches image batches to worker processes that each hold the models preloaded."""
+
+    def __init__(self, workers: int, torch_threads: int):
+        self.size = workers
+        self.torch_threads = torch_threads
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs Torch/threads is unsafe.
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,),
+        )
+
+    def _replace_broken(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Swap in fresh workers for an executor that lost a process; only the first caller rebuilds."""
+        with self._lock:
+            if self._executor is broken:
+                logger.warning("Inference worker pool broken (worker crashed or failed to start); restarting it")
+                self._executor = self._new_executor()
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self._executor
+
+    def _submit(
+        self,
+        image_paths: Sequence[Path],
+        quality: str,
+    ) -> Tuple[ProcessPoolExecutor, "Future[List[List[Dict]]]"]:
+        executor = self._executor
+        try:
+            return executor, self._submit_to(executor, image_paths, quality)
+        except BrokenProcessPool:
+            executor = self._replace_broken(executor)
+            return executor, self._submit_to(executor, image_paths, quality)
+
+    @staticmethod
+    def _submit_to(
+        executor: ProcessPoolExecutor,
+        image_paths: Sequence[Path],
+        quality: str,
+    ) -> "Future[List[List[Dict]]]":
+        return executor.submit(_run_job, [str(path) for path in image_paths], quality)
+
+    def iter_run(
+        self,
+        image_paths: Sequence[Path],
+        quality: str = "standard",
+        batch_size: int = 0,
+    ) -> Iterator[List[List[Detection]]]:
+        """
+        Run images on the workers and yield detections per job, in order.
+
+        With ``batch_size`` > 0 the images are split into jobs of that size and
+        spread over the workers; otherwise they go to one worker as a batch.
+        """
+        batch_size = batch_size if batch_size > 0 else len(image_paths)
+        jobs = []
+        for offset in range(0, len(image_paths), batch_size):
+            batch = image_paths[offset:offset + batch_size]
+            jobs.append((batch, *self._submit(batch, quality)))
+        for batch, executor, future in jobs:
+            try:
+                batch_detections = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed): retry this batch once on fresh
+                # workers; if it breaks them again, only this batch fails.
+                retry = self._submit_to(self._replace_broken(executor), batch, quality)
+                batch_detections = retry.result()
+            yield [[Detection(**detection) for detection in detections] for detections in batch_detections]
+
+    def run(
+        self,
+        image_paths: Sequence[Path],
+        quality: str = "standard",
+        batch_size: int = 0,
+    ) -> List[List[Detection]]:
+        """Run images on the workers and return detections per image."""
+        return [
+            detections
+            for job_detections in self.iter_run(image_paths, quality, batch_size)
+            for detections in job_detections
+        ]
+
+    def start(self) -> None:
+        """Start every worker and wait until each has loaded and warmed its models."""
+        # Each submit with no idle worker spawns a new process (and runs its
+        # initializer). A worker only takes tasks once its initializer is done,
+        # but a fast one may answer several pings, so ping until every process
+        # has answered.
+        executor = self._executor
+        seen = set()
+        while len(seen) < self.size:
+            futures = [executor.submit(_ping, 0.05) for _ in range(self.size)]
+            seen.update(future.result() for future in futures)
+        logger.info("Inference worker pool ready (%d processes)", self.size)
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=True, cancel_futures=cancel_futures)
+
+
+def get_worker_pool() -> Optional[InferenceWorkerPool]:
+    """Return the shared worker pool, or None when inference runs in-process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = resolve_worker_count()
+            if workers <= 0:
+                return None
+            threads = max(1, settings.INFERENCE_WORKER_THREADS)
+            logger.info("Starting %d inference workers (%d torch threads each)", workers, threads)
+            _pool = InferenceWorkerPool(workers, threads)
+    return _pool
+
+
+def restart_worker_pool() -> None:
+    """
+    Replace the pool with one whose workers load the current weights.
+
+    The new pool is fully started before it takes traffic; the old one is
+    retired in the background once the jobs already sent to it finish.
+    """
+    global _pool
+    workers = resolve_worker_count()
+    if workers <= 0:
+        return
+    new_pool = InferenceWorkerPool(workers, max(1, settings.INFERENCE_WORKER_THREADS))
+    new_pool.start()
+    with _pool_lock:
+        old_pool, _pool = _pool, new_pool
+    if old_pool is not None:
+        threading.Thread(
+            target=old_pool.shutdown,
+            kwargs={"cancel_futures": False},
+            name="retire-worker-pool",
+            daemon=True,
+        ).start()
+
+
+def shutdown_worker_pool() -> None:
+    """Stop the worker processes if the pool was started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
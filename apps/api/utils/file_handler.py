@@ -1,12 +1,30 @@
 """File upload handling utilities."""
+import asyncio
+import builtins
 import uuid
-import io
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Callable, List, Optional, TypeVar
 from fastapi import UploadFile
 from PIL import Image
 from apps.api.core.config import settings
 from apps.api.core.exceptions import FileValidationError, FileNotFoundError
+from apps.api.services.ml.dedup import perceptual_hash
+from apps.api.services.ml.preprocess import preprocess_upload, remove_artifacts
+from apps.api.utils.file_registry import FileRecord, FileRegistry, create_file_registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Extensions that name the same format share one blob per content hash.
+_EXTENSION_ALIASES = {".jpeg": ".jpg"}
 
 
 class FileHandler:
@@ -16,8 +34,13 @@ class FileHandler:
         self.upload_dir = settings.UPLOAD_DIR
         self.temp_dir = settings.TEMP_DIR
         self.max_file_size = settings.MAX_FILE_SIZE
+        self.chunk_size = max(1, settings.UPLOAD_CHUNK_SIZE)
+        self.blob_dir = self.temp_dir / "blobs"
         self.allowed_extensions = settings.ALLOWED_EXTENSIONS
-        self._file_registry = {}  # In-memory registry: file_id -> file_path
+        # file_id -> path and content hashes; shared across processes unless "memory"
+        self.registry: FileRegistry = create_file_registry()
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+        self._io_executor_lock = threading.Lock()
     
     def validate_file(self, file: UploadFile) -> None:
         """Validate uploaded file."""
@@ -34,74 +57,246 @@ class FileHandler:
                 f"File size exceeds limit of {self.max_file_size / (1024*1024):.1f}MB"
             )
     
-    async def save_file(self, file: UploadFile) -> str:
-        """Save uploaded file and return file ID."""
-        # Validate file
-        self.validate_file(file)
-        
-        # Read file content
-        content = await file.read()
-        
-        # Check file size
-        if len(content) > self.max_file_size:
-            raise FileValidationError(
-                f"File size exceeds limit of {self.max_file_size / (1024*1024):.1f}MB"
-            )
+    def _get_io_executor(self) -> ThreadPoolExecutor:
+        """Return the bounded thread pool for upload disk I/O and image checks."""
+        if self._io_executor is None:
+            with self._io_executor_lock:
+                if self._io_executor is None:
+                    workers = settings.UPLOAD_IO_WORKERS or os.cpu_count() or 1
+                    self._io_executor = ThreadPoolExecutor(
+                        max_workers=max(1, workers),
+                        thread_name_prefix="upload-io",
+                    )
+        return self._io_executor
+    
+    async def _run_io(self, func: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_io_executor(), func, *args)
+    
+    @staticmethod
+    def _open_partial(path: Path) -> BinaryIO:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "wb")
+    
+    @staticmethod
+    def _verify_and_publish(partial_path: Path, blob_path: Path, filename: str) -> None:
+        """Check the image header on disk, then move the upload into place."""
+        try:
+            with Image.open(partial_path) as image:
+                image.verify()  # Verify it's a valid image
+        except Exception as e:
+            # PIL's message names the temp path; keep it out of the response.
+            logger.debug("Rejected upload %s: %s", filename, e)
+            raise FileValidationError(f"Invalid image file: {filename}")
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial_path, blob_path)
+    
+    def blob_path(self, sha256: str, file_ext: str) -> Path:
+        """Content-addressed location of an upload: blobs/<sha[:2]>/<sha><ext>."""
+        file_ext = _EXTENSION_ALIASES.get(file_ext, file_ext)
+        return self.blob_dir / sha256[:2] / f"{sha256}{file_ext}"
+    
+    def is_blob_path(self, path: Path) -> bool:
+        return self.blob_dir in path.parents
+    
+    async def _hash_upload(self, file: UploadFile) -> str:
+        """Hash the spooled upload, enforcing MAX_FILE_SIZE as bytes arrive."""
+        digest = hashlib.sha256()
+        size = 0
+        while chunk := await file.read(self.chunk_size):
+            size += len(chunk)
+            if size > self.max_file_size:
+                raise FileValidationError(
+                    f"{file.filename}: File size exceeds limit of {self.max_file_size / (1024*1024):.1f}MB"
+                )
+            await self._run_io(digest.update, chunk)
         
         # Check if file is empty
-        if len(content) == 0:
-            raise FileValidationError("File is empty")
-        
-        # Validate image format
+        if size == 0:
+            raise FileValidationError(f"{file.filename}: File is empty")
+        return digest.hexdigest()
+    
+    async def _write_blob(self, file: UploadFile, file_id: str, blob_path: Path) -> None:
+        """Copy the upload to disk in chunks, validate it and publish it as ``blob_path``."""
+        partial_path = self.temp_dir / f"{file_id}{blob_path.suffix}.part"
         try:
-            image = Image.open(io.BytesIO(content))
-            image.verify()  # Verify it's a valid image
-        except Exception as e:
-            raise FileValidationError(f"Invalid image file: {str(e)}")
+            await file.seek(0)
+            f = await self._run_io(self._open_partial, partial_path)
+            try:
+                while chunk := await file.read(self.chunk_size):
+                    await self._run_io(f.write, chunk)
+            finally:
+                await self._run_io(f.close)
+            
+            # Validate image format from the file on disk
+            await self._run_io(self._verify_and_publish, partial_path, blob_path, file.filename)
+        finally:
+            partial_path.unlink(missing_ok=True)
+    
+    async def save_file(self, file: UploadFile) -> str:
+        """
+        Store an uploaded file by content hash and return a new file ID for it.
+        
+        The upload is hashed in UPLOAD_CHUNK_SIZE chunks first, so memory use
+        stays constant and MAX_FILE_SIZE is enforced as bytes arrive. Bytes
+        already stored under the same hash are referenced, not written,
+        validated or preprocessed again. Blocking work runs on the upload
+        I/O pool, never on the event loop.
+        """
+        # Validate file
+        self.validate_file(file)
         
         # Generate unique file ID
         file_id = str(uuid.uuid4())
-        file_ext = Path(file.filename).suffix.lower()
-        file_path = self.temp_dir / f"{file_id}{file_ext}"
+        sha256 = await self._hash_upload(file)
+        blob_path = self.blob_path(sha256, Path(file.filename).suffix.lower())
         
-        # Save file
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Take the reference before looking at the blob: a concurrent cleanup
+        # that dropped the last reference then keeps the blob (see _remove_blob).
+        await self._run_io(self.registry.incref_blob, blob_path.name)
+        created = False
+        try:
+            if not await self._run_io(blob_path.exists):
+                await self._write_blob(file, file_id, blob_path)
+                created = True
+            # Register file
+            await self._run_io(self.registry.put, file_id, FileRecord(path=str(blob_path), sha256=sha256))
+        except BaseException:
+            await self._run_io(self.registry.decref_blob, blob_path.name)
+            raise
         
-        # Register file
-        self._file_registry[file_id] = str(file_path)
+        if created and settings.UPLOAD_PREPROCESS_ENABLED:
+            try:
+                await self._run_io(preprocess_upload, blob_path)
+            except Exception as e:
+                # Inference falls back to decoding the original.
+                logger.warning("Preprocessing failed for %s: %s", file_id, e)
         
         return file_id
     
     async def save_files(self, files: List[UploadFile]) -> List[str]:
-        """Save multiple files and return list of file IDs."""
-        file_ids = []
-        for file in files:
-            file_id = await self.save_file(file)
-            file_ids.append(file_id)
-        return file_ids
+        """
+        Save multiple files concurrently and return their IDs in request order.
+        
+        At most UPLOAD_PARALLELISM files of the request are in flight at once.
+        If any file fails, the ones already saved are removed and the first
+        error (in request order) is raised.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.UPLOAD_PARALLELISM))
+        
+        async def save_one(file: UploadFile) -> str:
+            async with semaphore:
+                return await self.save_file(file)
+        
+        results = await asyncio.gather(*(save_one(file) for file in files), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            await self._run_io(self.cleanup_files, [result for result in results if isinstance(result, str)])
+            raise errors[0]
+        return list(results)
     
     def get_file_path(self, file_id: str) -> Path:
         """Get file path by file ID."""
-        if file_id not in self._file_registry:
-            raise FileNotFoundError(file_id)
-        return Path(self._file_registry[file_id])
+        return self.get_file_paths([file_id])[0]
+    
+    def get_file_paths(self, file_ids: List[str]) -> List[Path]:
+        """Get the paths of several files with one registry lookup."""
+        records = self.registry.get_many(file_ids)
+        for file_id in file_ids:
+            if file_id not in records:
+                raise FileNotFoundError(file_id)
+        return [Path(records[file_id].path) for file_id in file_ids]
+    
+    def register_file(self, file_id: str, file_path: Path) -> None:
+        """Register an already-saved file under an existing file ID."""
+        if self.is_blob_path(Path(file_path)):
+            self.registry.incref_blob(Path(file_path).name)
+        self.registry.put(file_id, FileRecord(path=str(file_path)))
     
     def file_exists(self, file_id: str) -> bool:
         """Check if file exists."""
-        if file_id not in self._file_registry:
+        return self.files_exist([file_id])[0]
+    
+    def files_exist(self, file_ids: List[str]) -> List[bool]:
+        """Check several files with one registry lookup."""
+        records = self.registry.get_many(file_ids)
+        return [file_id in records and Path(records[file_id].path).exists() for file_id in file_ids]
+    
+    def touch_files(self, file_ids: List[str]) -> None:
+        """Mark files as used now (drives the storage janitor's idle TTL and LRU)."""
+        self.registry.touch(file_ids, time.time())
+    
+    def get_file_hashes(self, file_ids: List[str]) -> List[str]:
+        """Get the SHA-256 of several files, hashing only those never hashed before."""
+        records = self.registry.get_many(file_ids)
+        hashes = []
+        for file_id in file_ids:
+            record = records.get(file_id)
+            if record is None:
+                raise FileNotFoundError(file_id)
+            if record.sha256 is None:
+                digest = hashlib.sha256()
+                with open(record.path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+                record = replace(record, sha256=digest.hexdigest())
+                records[file_id] = record
+                self.registry.update(file_id, sha256=record.sha256)
+            hashes.append(record.sha256)
+        return hashes
+    
+    def get_perceptual_hashes(self, file_ids: List[str]) -> List[int]:
+        """Get the perceptual hashes of several images, computing only missing ones."""
+        records = self.registry.get_many(file_ids)
+        hashes = []
+        for file_id in file_ids:
+            record = records.get(file_id)
+            if record is None:
+                raise FileNotFoundError(file_id)
+            if record.phash is None:
+                record = replace(record, phash=perceptual_hash(Path(record.path)))
+                records[file_id] = record
+                self.registry.update(file_id, phash=record.phash)
+            hashes.append(record.phash)
+        return hashes
+    
+    def cleanup_file(self, file_id: str) -> bool:
+        """
+        Remove file from registry, and from storage once no file ID references it.
+        
+        Returns False if the file ID was not registered.
+        """
+        record = self.registry.get(file_id)
+        # Only the caller that actually removed the ID drops its blob reference.
+        if record is None or not self.registry.delete(file_id):
             return False
-        file_path = Path(self._file_registry[file_id])
-        return file_path.exists()
+        file_path = Path(record.path)
+        if not self.is_blob_path(file_path):
+            file_path.unlink(missing_ok=True)
+            remove_artifacts(file_path)
+        elif self.registry.decref_blob(file_path.name) <= 0:
+            self._remove_blob(file_path)
+        return True
     
-    def cleanup_file(self, file_id: str) -> None:
-        """Remove file from storage and registry."""
-        if file_id in self._file_registry:
-            file_path = Path(self._file_registry[file_id])
-            if file_path.exists():
-                file_path.unlink()
-            del self._file_registry[file_id]
+    def _remove_blob(self, blob_path: Path) -> None:
+        """
+        Delete an unreferenced blob without racing a concurrent upload of it.
+        
+        The blob is moved aside before the reference count is re-read. An
+        upload increments the count before checking whether the blob exists,
+        so it either sees the count restore the blob here or finds it missing
+        and writes its own copy.
+        """
+        tombstone = blob_path.with_name(f"{blob_path.name}.{uuid.uuid4().hex}.deleting")
+        try:
+            os.replace(blob_path, tombstone)
+        except builtins.FileNotFoundError:  # the module-level name is the API's 404
+            return
+        if self.registry.blob_refs(blob_path.name) > 0:
+            os.replace(tombstone, blob_path)
+            return
+        tombstone.unlink(missing_ok=True)
+        remove_artifacts(blob_path)
     
     def cleanup_files(self, file_ids: List[str]) -> None:
         """Remove multiple files."""
@@ -110,6 +305,14 @@ class FileHandler:
                 self.cleanup_file(file_id)
             except Exception:
                 pass  # Ignore errors during cleanup
+    
+    def shutdown(self) -> None:
+        """Stop the upload I/O pool and close the registry."""
+        with self._io_executor_lock:
+            executor, self._io_executor = self._io_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.registry.close()
 
 
 # Global file handler instance
@@ -0,0 +1,385 @@
+"""
+Registry of uploaded files (file_id -> path and content hashes) and of blob
+reference counts, shareable across API processes.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from apps.api.core.config import settings
+
+try:
+    import redis
+except ImportError:  # Fallback when redis isn't installed
+    redis = None
+
+FILE_REGISTRY_BACKENDS = ("memory", "sqlite", "redis")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    sha256 TEXT,
+    phash TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    name TEXT PRIMARY KEY,
+    refs INTEGER NOT NULL
+);
+"""
+
+# SQLite caps bound parameters per statement (999 on older builds).
+_SQLITE_BATCH = 500
+
+
+@dataclass(frozen=True)
+class FileRecord:
+    """One registered upload."""
+
+    path: str
+    sha256: Optional[str] = None
+    phash: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    # Last time inference used the file; None until it first does
+    accessed_at: Optional[float] = None
+
+    @property
+    def last_used(self) -> float:
+        return self.accessed_at if self.accessed_at is not None else self.created_at
+
+
+class FileRegistry(ABC):
+    """Backend interface: batch lookups first, single lookups built on them."""
+
+    @abstractmethod
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, FileRecord]:
+        """Return the records of the registered IDs among ``file_ids``."""
+
+    @abstractmethod
+    def put(self, file_id: str, record: FileRecord) -> None:
+        """Register (or replace) a file."""
+
+    @abstractmethod
+    def update(self, file_id: str, **fields) -> None:
+        """Set hash fields (``sha256``, ``phash``) of a registered file."""
+
+    @abstractmethod
+    def delete(self, file_id: str) -> bool:
+        """Forget a file; False if it was not registered (e.g. another process removed it)."""
+
+    @abstractmethod
+    def touch(self, file_ids: Iterable[str], at: float) -> None:
+        """Record that inference used these files at ``at``."""
+
+    @abstractmethod
+    def scan(self) -> Iterator[Tuple[str, FileRecord]]:
+        """Iterate over every registered file (for housekeeping, not request paths)."""
+
+    @abstractmethod
+    def incref_blob(self, name: str) -> int:
+        """Atomically add a reference to a stored blob and return the new count."""
+
+    @abstractmethod
+    def decref_blob(self, name: str) -> int:
+        """Atomically drop a reference to a stored blob and return the new count (never below 0)."""
+
+    @abstractmethod
+    def blob_refs(self, name: str) -> int:
+        """Return the number of file IDs referencing a blob."""
+
+    def get(self, file_id: str) -> Optional[FileRecord]:
+        return self.get_many([file_id]).get(file_id)
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryFileRegistry(FileRegistry):
+    """In-process dict: fastest, but only valid with a single API process."""
+
+    def __init__(self):
+        self._records: Dict[str, FileRecord] = {}
+        self._blob_refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, FileRecord]:
+        records = self._records
+        return {file_id: records[file_id] for file_id in file_ids if file_id in records}
+
+    def put(self, file_id: str, record: FileRecord) -> None:
+        with self._lock:
+            self._records[file_id] = record
+
+    def update(self, file_id: str, **fields) -> None:
+        with self._lock:
+            record = self._records.get(file_id)
+            if record is not None:
+                self._records[file_id] = replace(record, **fields)
+
+    def delete(self, file_id: str) -> bool:
+        with self._lock:
+            return self._records.pop(file_id, None) is not None
+
+    def touch(self, file_ids: Iterable[str], at: float) -> None:
+        with self._lock:
+            for file_id in file_ids:
+                record = self._records.get(file_id)
+                if record is not None:
+                    self._records[file_id] = replace(record, accessed_at=at)
+
+    def scan(self) -> Iterator[Tuple[str, FileRecord]]:
+        return iter(list(self._records.items()))
+
+    def incref_blob(self, name: str) -> int:
+        with self._lock:
+            refs = self._blob_refs.get(name, 0) + 1
+            self._blob_refs[name] = refs
+        return refs
+
+    def decref_blob(self, name: str) -> int:
+        with self._lock:
+            refs = max(0, self._blob_refs.get(name, 0) - 1)
+            if refs:
+                self._blob_refs[name] = refs
+            else:
+                self._blob_refs.pop(name, None)
+        return refs
+
+    def blob_refs(self, name: str) -> int:
+        return self._blob_refs.get(name, 0)
+
+
+class SQLiteFileRegistry(FileRegistry):
+    """SQLite file in WAL mode; shared by every API process that can reach the file."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # WAL lets lookups from other workers run while an upload registers.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(files)")}
+            if "accessed_at" not in columns:
+                self._conn.execute("ALTER TABLE files ADD COLUMN accessed_at REAL")
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> FileRecord:
+        # phash is stored as hex: SQLite integers are signed 64-bit.
+        return FileRecord(
+            path=row["path"],
+            sha256=row["sha256"],
+            phash=int(row["phash"], 16) if row["phash"] is not None else None,
+            created_at=row["created_at"],
+            accessed_at=row["accessed_at"],
+        )
+
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, FileRecord]:
+        file_ids = list(dict.fromkeys(file_ids))
+        records = {}
+        for offset in range(0, len(file_ids), _SQLITE_BATCH):
+            chunk = file_ids[offset:offset + _SQLITE_BATCH]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM files WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+            records.update((row["id"], self._record(row)) for row in rows)
+        return records
+
+    def put(self, file_id: str, record: FileRecord) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (id, path, sha256, phash, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    file_id,
+                    record.path,
+                    record.sha256,
+                    format(record.phash, "x") if record.phash is not None else None,
+                    record.created_at,
+                    record.accessed_at,
+                ),
+            )
+
+    def update(self, file_id: str, **fields) -> None:
+        if "phash" in fields and fields["phash"] is not None:
+            fields["phash"] = format(fields["phash"], "x")
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE files SET {columns} WHERE id = ?", (*fields.values(), file_id))
+
+    def delete(self, file_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,)).rowcount == 1
+
+    def touch(self, file_ids: Iterable[str], at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE files SET accessed_at = ? WHERE id = ?", [(at, file_id) for file_id in file_ids]
+            )
+
+    def scan(self) -> Iterator[Tuple[str, FileRecord]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM files").fetchall()
+        return ((row["id"], self._record(row)) for row in rows)
+
+    def _refs_locked(self, name: str) -> int:
+        row = self._conn.execute("SELECT refs FROM blobs WHERE name = ?", (name,)).fetchone()
+        return row["refs"] if row is not None else 0
+
+    # Write, then read back in one IMMEDIATE transaction rather than using
+    # RETURNING, which needs SQLite 3.35+ (Debian bullseye ships 3.34).
+    def incref_blob(self, name: str) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO blobs (name, refs) VALUES (?, 1)"
+                " ON CONFLICT (name) DO UPDATE SET refs = refs + 1",
+                (name,),
+            )
+            return self._refs_locked(name)
+
+    def decref_blob(self, name: str) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE name = ? AND refs > 0", (name,))
+            refs = self._refs_locked(name)
+            if refs == 0:
+                self._conn.execute("DELETE FROM blobs WHERE name = ? AND refs = 0", (name,))
+            return refs
+
+    def blob_refs(self, name: str) -> int:
+        with self._lock:
+            return self._refs_locked(name)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisFileRegistry(FileRegistry):
+    """One hash per file in any Redis-protocol store (Redis, Valkey, KeyDB...)."""
+
+    _PREFIX = "auto_damage:file:"
+    _BLOB_PREFIX = "auto_damage:blob:"
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("FILE_REGISTRY_BACKEND=redis requires the redis package (pip install redis)")
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, file_id: str) -> str:
+        return f"{self._PREFIX}{file_id}"
+
+    @staticmethod
+    def _fields(record: FileRecord) -> Dict[str, str]:
+        fields = {"path": record.path, "created_at": repr(record.created_at)}
+        if record.sha256 is not None:
+            fields["sha256"] = record.sha256
+        if record.phash is not None:
+            fields["phash"] = format(record.phash, "x")
+        if record.accessed_at is not None:
+            fields["accessed_at"] = repr(record.accessed_at)
+        return fields
+
+    @staticmethod
+    def _record(fields: Dict[str, str]) -> FileRecord:
+        return FileRecord(
+            path=fields["path"],
+            sha256=fields.get("sha256"),
+            phash=int(fields["phash"], 16) if "phash" in fields else None,
+            created_at=float(fields["created_at"]),
+            accessed_at=float(fields["accessed_at"]) if "accessed_at" in fields else None,
+        )
+
+    def get_many(self, file_ids: Iterable[str]) -> Dict[str, FileRecord]:
+        file_ids = list(dict.fromkeys(file_ids))
+        # One round trip for the whole batch.
+        pipeline = self._client.pipeline(transaction=False)
+        for file_id in file_ids:
+            pipeline.hgetall(self._key(file_id))
+        records = {}
+        for file_id, fields in zip(file_ids, pipeline.execute()):
+            if fields:
+                records[file_id] = self._record(fields)
+        return records
+
+    def put(self, file_id: str, record: FileRecord) -> None:
+        key = self._key(file_id)
+        pipeline = self._client.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping=self._fields(record))
+        pipeline.execute()
+
+    def update(self, file_id: str, **fields) -> None:
+        if "phash" in fields and fields["phash"] is not None:
+            fields["phash"] = format(fields["phash"], "x")
+        key = self._key(file_id)
+        # Only touch files that still exist; a concurrent cleanup wins.
+        if self._client.exists(key):
+            self._client.hset(key, mapping=fields)
+
+    def delete(self, file_id: str) -> bool:
+        return self._client.delete(self._key(file_id)) == 1
+
+    def touch(self, file_ids: Iterable[str], at: float) -> None:
+        file_ids = list(dict.fromkeys(file_ids))
+        pipeline = self._client.pipeline(transaction=False)
+        for file_id in file_ids:
+            pipeline.exists(self._key(file_id))
+        # hset on a removed file would resurrect it without a path.
+        live = [file_id for file_id, exists in zip(file_ids, pipeline.execute()) if exists]
+        pipeline = self._client.pipeline(transaction=False)
+        for file_id in live:
+            pipeline.hset(self._key(file_id), "accessed_at", repr(at))
+        pipeline.execute()
+
+    def scan(self) -> Iterator[Tuple[str, FileRecord]]:
+        keys = list(self._client.scan_iter(match=f"{self._PREFIX}*", count=1000))
+        for offset in range(0, len(keys), 1000):
+            batch = keys[offset:offset + 1000]
+            pipeline = self._client.pipeline(transaction=False)
+            for key in batch:
+                pipeline.hgetall(key)
+            for key, fields in zip(batch, pipeline.execute()):
+                if fields.get("path"):
+                    yield key[len(self._PREFIX):], self._record(fields)
+
+    def incref_blob(self, name: str) -> int:
+        return int(self._client.incr(f"{self._BLOB_PREFIX}{name}"))
+
+    def decref_blob(self, name: str) -> int:
+        # Counters left at 0 are harmless; deleting them would race incref.
+        return max(0, int(self._client.decr(f"{self._BLOB_PREFIX}{name}")))
+
+    def blob_refs(self, name: str) -> int:
+        return max(0, int(self._client.get(f"{self._BLOB_PREFIX}{name}") or 0))
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_file_registry() -> FileRegistry:
+    """Build the registry selected by FILE_REGISTRY_BACKEND."""
+    backend = settings.FILE_REGISTRY_BACKEND.strip().lower()
+    if backend == "memory":
+        return MemoryFileRegistry()
+    if backend == "sqlite":
+        return SQLiteFileRegistry(settings.FILE_REGISTRY_DB_PATH)
+    if backend == "redis":
+        return RedisFileRegistry(settings.FILE_REGISTRY_REDIS_URL)
+    raise ValueError(
+        f"Unsupported FILE_REGISTRY_BACKEND '{settings.FILE_REGISTRY_BACKEND}'. "
+        f"Use one of: {', '.join(FILE_REGISTRY_BACKENDS)}"
+    )
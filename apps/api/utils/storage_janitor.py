@@ -0,0 +1,216 @@
+"""Background cleanup of TEMP_DIR: idle-upload TTL, byte quota (LRU) and orphaned files."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from apps.api.core.config import settings
+from apps.api.core.metrics import JANITOR_EVICTIONS_TOTAL, JANITOR_FREED_BYTES_TOTAL, TEMP_STORAGE_BYTES
+from apps.api.services.ml.jobs import get_job_manager
+from apps.api.services.ml.preprocess import artifact_paths
+from apps.api.utils.file_handler import FileHandler, file_handler
+from apps.api.utils.file_registry import FileRecord
+
+logger = logging.getLogger(__name__)
+
+# Files nobody references for this long are leftovers: interrupted uploads,
+# preprocessing temp files, blobs whose registry entries were lost (memory
+# backend restart). Live uploads register within seconds of being written.
+_ORPHAN_GRACE_SECONDS = 3600
+
+_janitor: Optional["StorageJanitor"] = None
+
+
+def _stored_size(path: Path) -> int:
+    """Bytes used by an upload and its preprocessing artifacts."""
+    total = 0
+    for candidate in (path, *artifact_paths(path)):
+        try:
+            total += candidate.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class StorageJanitor:
+    """
+    Periodically frees temp storage without touching the request path.
+
+    Each sweep removes uploads unused for ``ttl_seconds``, then files no
+    upload references, then evicts the least recently used uploads until
+    TEMP_DIR fits in ``quota_bytes``. Uploads go through
+    ``FileHandler.cleanup_file``, so registry entries and blob references
+    are released too; several API processes may sweep concurrently.
+    """
+
+    def __init__(
+        self,
+        handler: FileHandler,
+        ttl_seconds: float,
+        quota_bytes: int,
+        interval_seconds: float,
+        active_paths: Callable[[], Set[str]] = set,
+    ):
+        self.handler = handler
+        # Paths still needed by queued/running inference jobs, never evicted
+        self.active_paths = active_paths
+        self.ttl = ttl_seconds
+        self.quota = quota_bytes
+        self.interval = max(1.0, interval_seconds)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="storage-janitor", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as exc:
+                logger.exception("Storage janitor sweep failed: %s", exc)
+
+    def sweep(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Run one cleanup pass; returns evictions and freed bytes per reason."""
+        now = time.time() if now is None else now
+        stats = {"ttl": 0, "quota": 0, "orphan": 0, "freed_bytes": 0}
+        records = dict(self.handler.registry.scan())
+        protected = self.active_paths()
+
+        if self.ttl > 0:
+            for file_id, record in list(records.items()):
+                if now - record.last_used > self.ttl and record.path not in protected:
+                    freed = self._evict(file_id, "ttl", used_before=now - self.ttl)
+                    if freed is not None:
+                        stats["ttl"] += 1
+                        stats["freed_bytes"] += freed
+                        del records[file_id]
+
+        usage = self._sweep_orphans(records, protected, now, stats)
+
+        if self.quota > 0 and usage > self.quota:
+            evictable = {file_id: record for file_id, record in records.items() if record.path not in protected}
+            usage -= self._enforce_quota(evictable, usage, now, stats)
+
+        TEMP_STORAGE_BYTES.set(usage)
+        if stats["ttl"] or stats["quota"] or stats["orphan"]:
+            logger.info(
+                "Storage janitor: evicted %d expired, %d over quota, %d orphaned; freed %.1fMB, %.1fMB in use",
+                stats["ttl"],
+                stats["quota"],
+                stats["orphan"],
+                stats["freed_bytes"] / (1024 * 1024),
+                usage / (1024 * 1024),
+            )
+        return stats
+
+    def _evict(self, file_id: str, reason: str, used_before: float) -> Optional[int]:
+        """Remove one upload unless it was used since ``used_before``; returns bytes freed or None."""
+        # Re-read the record: inference may have touched it since the scan.
+        record = self.handler.registry.get(file_id)
+        if record is None or record.last_used > used_before:
+            return None
+        path = Path(record.path)
+        size = _stored_size(path)
+        if not self.handler.cleanup_file(file_id):
+            return None
+        # Shared blobs are only freed with their last reference.
+        freed = 0 if path.exists() else size
+        JANITOR_EVICTIONS_TOTAL.labels(reason=reason).inc()
+        JANITOR_FREED_BYTES_TOTAL.labels(reason=reason).inc(freed)
+        return freed
+
+    def _sweep_orphans(
+        self,
+        records: Dict[str, FileRecord],
+        protected: Set[str],
+        now: float,
+        stats: Dict[str, int],
+    ) -> int:
+        """Delete stale unreferenced files under TEMP_DIR and return the bytes still in use."""
+        referenced: Set[Path] = set()
+        for path in (*(record.path for record in records.values()), *protected):
+            path = Path(path)
+            referenced.add(path)
+            referenced.update(artifact_paths(path))
+
+        usage = 0
+        for root, _, names in os.walk(self.handler.temp_dir):
+            for name in names:
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if path in referenced or now - stat.st_mtime < _ORPHAN_GRACE_SECONDS:
+                    usage += stat.st_size
+                    continue
+                # A blob may have been referenced by another process after the scan.
+                if self.handler.is_blob_path(path) and self.handler.registry.blob_refs(name) > 0:
+                    usage += stat.st_size
+                    continue
+                path.unlink(missing_ok=True)
+                stats["orphan"] += 1
+                stats["freed_bytes"] += stat.st_size
+                JANITOR_EVICTIONS_TOTAL.labels(reason="orphan").inc()
+                JANITOR_FREED_BYTES_TOTAL.labels(reason="orphan").inc(stat.st_size)
+        return usage
+
+    def _enforce_quota(self, records: Dict[str, FileRecord], usage: int, now: float, stats: Dict[str, int]) -> int:
+        """Evict least recently used uploads until ``usage`` fits the quota; returns bytes freed."""
+        # Files sharing a blob are evicted together: the bytes are freed only with the last one.
+        by_path: Dict[str, Tuple[float, List[str]]] = {}
+        for file_id, record in records.items():
+            last_used, file_ids = by_path.get(record.path, (0.0, []))
+            file_ids.append(file_id)
+            by_path[record.path] = (max(last_used, record.last_used), file_ids)
+
+        # Never evict what was used within the last sweep interval (likely in flight).
+        used_before = now - self.interval
+        freed_total = 0
+        for last_used, file_ids in sorted(by_path.values(), key=lambda item: item[0]):
+            if usage - freed_total <= self.quota or last_used > used_before:
+                break
+            for file_id in file_ids:
+                freed = self._evict(file_id, "quota", used_before=used_before)
+                if freed is not None:
+                    stats["quota"] += 1
+                    stats["freed_bytes"] += freed
+                    freed_total += freed
+        return freed_total
+
+
+def start_storage_janitor() -> None:
+    """Start the background janitor when TEMP_JANITOR_ENABLED is set."""
+    global _janitor
+    if not settings.TEMP_JANITOR_ENABLED or _janitor is not None:
+        return
+    _janitor = StorageJanitor(
+        file_handler,
+        ttl_seconds=settings.UPLOAD_TTL_SECONDS,
+        quota_bytes=settings.TEMP_QUOTA_BYTES,
+        interval_seconds=settings.TEMP_JANITOR_INTERVAL_SECONDS,
+        active_paths=lambda: get_job_manager().store.active_file_paths(),
+    )
+    _janitor.start()
+    logger.info(
+        "Storage janitor every %.0fs (ttl=%ss, quota=%s bytes)",
+        _janitor.interval,
+        settings.UPLOAD_TTL_SECONDS,
+        settings.TEMP_QUOTA_BYTES or "unlimited",
+    )
+
+
+def stop_storage_janitor() -> None:
+    global _janitor
+    if _janitor is not None:
+        _janitor.stop()
+        _janitor = None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Batched Inference Equivalence Test
+Runs a mixed-size batch of images, some with no detected parts, through the
+batched two-stage path and through the per-image `_process_image` path with
+stand-in YOLO models, and checks both return exactly the same
+`InferenceImageResult` list (sequential and parallel stages, with and
+without the damage cascade).
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_batch_equivalence.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.core.config import settings  # noqa: E402
+from apps.api.models.detection import InferenceImageResult  # noqa: E402
+from apps.api.services.ml import inference  # noqa: E402
+from apps.api.services.ml.model_loader import _build_label_table, model_registry  # noqa: E402
+from apps.api.services.ml.registry import ModelVersion  # noqa: E402
+
+# (width, height, color); black images have no parts, so Stage 2 skips them.
+IMAGES = [
+    ((640, 480), (200, 40, 40)),
+    ((320, 240), (0, 0, 0)),
+    ((300, 500), (30, 160, 90)),
+    ((1024, 768), (90, 90, 220)),
+    ((96, 128), (0, 0, 0)),
+    ((800, 450), (250, 250, 250)),
+]
+
+BASE_SETTINGS = {
+    "INFERENCE_MODE": "two_stage",
+    "INFERENCE_SCHEDULER_ENABLED": False,
+    "INFERENCE_WORKERS": 0,
+    "RESULT_CACHE_ENABLED": False,
+    "DEDUP_ENABLED": False,
+}
+
+
+class _Boxes:
+    def __init__(self, rows: List[Tuple[float, int, List[float]]]):
+        self.conf = np.array([row[0] for row in rows], dtype=np.float32)
+        self.cls = np.array([row[1] for row in rows], dtype=np.float32)
+        self.xyxy = np.array([row[2] for row in rows], dtype=np.float32).reshape(-1, 4)
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+
+class _Result:
+    def __init__(self, rows: List[Tuple[float, int, List[float]]]):
+        self.boxes = _Boxes(rows)
+
+
+class _FakeYOLO:
+    """Stand-in detector whose boxes depend only on each source's pixels."""
+
+    def __init__(self, names: Dict[int, str], detect):
+        self.names = names
+        self._detect = detect
+        self.batch_sizes: List[int] = []
+
+    def predict(self, source: Any, **kwargs: Any) -> List[_Result]:
+        sources = source if isinstance(source, list) else [source]
+        self.batch_sizes.append(len(sources))
+        return [_Result(self._detect(np.asarray(image))) for image in sources]
+
+
+def _parts(image: np.ndarray) -> List[Tuple[float, int, List[float]]]:
+    if not image.any():
+        return []
+    h, w = image.shape[:2]
+    shade = float(image.mean()) / 255
+    return [
+        (0.5 + shade / 4, 0, [0.05 * w, 0.1 * h, 0.35 * w, 0.4 * h]),
+        (0.4 + shade / 4, 1, [0.6 * w, 0.55 * h, 0.9 * w, 0.9 * h]),
+        (0.1, 2, [0.0, 0.0, w, h]),  # below PART_CONF_THRESHOLD
+    ]
+
+
+def _damage(image: np.ndarray) -> List[Tuple[float, int, List[float]]]:
+    h, w = image.shape[:2]
+    shade = float(image.mean()) / 255
+    return [
+        (0.3 + shade / 2, 0, [0.1 * w, 0.15 * h, 0.3 * w, 0.35 * h]),  # on the hood of a full frame
+        (0.6 - shade / 4, 1, [0.3 * w, 0.3 * h, 0.7 * w, 0.7 * h]),  # on the part of a cascade crop
+        (0.2, 1, [0.6 * w, 0.5 * h, 0.9 * w, 0.9 * h]),  # below DAMAGE_CONF_THRESHOLD
+    ]
+
+
+def _write_images(tmp: str) -> List[Path]:
+    paths = []
+    for idx, (size, color) in enumerate(IMAGES):
+        path = Path(tmp) / f"image_{idx}.png"
+        Image.new("RGB", size, color).save(path)
+        paths.append(path)
+    return paths
+
+
+def _compare(overrides: Dict[str, Any]) -> None:
+    config = {**BASE_SETTINGS, **overrides}
+    previous_settings = {name: getattr(settings, name) for name in (*config, "INFERENCE_BATCH_SIZE")}
+    part_model = _FakeYOLO({0: "Hood", 1: "Front Door", 2: "Roof"}, _parts)
+    damage_model = _FakeYOLO({0: "Dent", 1: "Scratch"}, _damage)
+    previous_versions = model_registry.swap({
+        name: ModelVersion(
+            name=name,
+            path=Path(f"{name}.pt"),
+            weights_hash="fake",
+            model=model,
+            labels=_build_label_table(model.names),
+        )
+        for name, model in (("part", part_model), ("damage", damage_model))
+    })
+    for name, value in config.items():
+        setattr(settings, name, value)
+    try:
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+            paths = _write_images(tmp)
+            image_ids = [path.stem for path in paths]
+
+            per_image = [
+                InferenceImageResult(image_id=image_id, detections=inference._process_image(path))
+                for image_id, path in zip(image_ids, paths)
+            ]
+            assert part_model.batch_sizes == [1] * len(paths), part_model.batch_sizes
+
+            part_model.batch_sizes.clear()
+            settings.INFERENCE_BATCH_SIZE = len(paths)
+            batched = [result for _, result, _ in inference._iter_results(image_ids, paths, True, "standard")]
+            assert part_model.batch_sizes == [len(paths)], part_model.batch_sizes
+
+        assert batched == per_image, (batched, per_image)
+        assert [bool(result.detections) for result in per_image] == [bool(any(color)) for _, color in IMAGES]
+        # Both matched damage and intact parts are compared.
+        damage_types = {d.damage_type for result in per_image for d in result.detections}
+        assert "intact" in damage_types and len(damage_types) > 1, damage_types
+    finally:
+        for name, value in previous_settings.items():
+            setattr(settings, name, value)
+        model_registry.swap(previous_versions)
+
+
+def test_sequential_stages() -> None:
+    _compare({"STAGE_EXECUTION_MODE": "sequential", "DAMAGE_CASCADE_ENABLED": False})
+
+
+def test_parallel_stages() -> None:
+    _compare({"STAGE_EXECUTION_MODE": "parallel", "DAMAGE_CASCADE_ENABLED": False})
+
+
+def test_damage_cascade() -> None:
+    _compare({"STAGE_EXECUTION_MODE": "sequential", "DAMAGE_CASCADE_ENABLED": True})
+
+
+def main() -> None:
+    print("=== Batched Inference Equivalence Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Sequential stages", test_sequential_stages),
+        ("Parallel stages", test_parallel_stages),
+        ("Damage cascade", test_damage_cascade),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] Batched inference returns the same results as the per-image path.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Upload Storage Test
+Checks the blob reference counts of the memory and SQLite file registries,
+that identical uploads share one blob which is deleted with its last file
+ID, and that `FileHandler._remove_blob` keeps a blob an upload re-referenced
+while it was being deleted.
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_blob_storage.py
+"""
+import asyncio
+import io
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.utils.file_handler import FileHandler  # noqa: E402
+from apps.api.utils.file_registry import (  # noqa: E402
+    FileRegistry,
+    MemoryFileRegistry,
+    SQLiteFileRegistry,
+)
+
+
+def _registries(tmp: str) -> List[FileRegistry]:
+    return [MemoryFileRegistry(), SQLiteFileRegistry(Path(tmp) / "files.sqlite3")]
+
+
+def _handler(tmp: str, registry: FileRegistry) -> FileHandler:
+    handler = FileHandler()
+    handler.temp_dir = Path(tmp) / "temp"
+    handler.blob_dir = handler.temp_dir / "blobs"
+    handler.registry = registry
+    return handler
+
+
+def _png(color: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _upload(handler: FileHandler, data: bytes, filename: str) -> str:
+    return asyncio.run(handler.save_file(UploadFile(io.BytesIO(data), filename=filename)))
+
+
+def _stored_files(handler: FileHandler) -> List[Path]:
+    return sorted(path for path in handler.blob_dir.rglob("*") if path.is_file())
+
+
+def test_refcounts() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        for registry in _registries(tmp):
+            name = type(registry).__name__
+            assert registry.blob_refs("a.jpg") == 0, name
+            assert registry.incref_blob("a.jpg") == 1, name
+            assert registry.incref_blob("a.jpg") == 2, name
+            assert registry.incref_blob("b.jpg") == 1, name
+            assert registry.decref_blob("a.jpg") == 1, name
+            assert registry.blob_refs("a.jpg") == 1, name
+            assert registry.decref_blob("a.jpg") == 0, name
+            # Never negative, and a later upload starts counting from zero again.
+            assert registry.decref_blob("a.jpg") == 0, name
+            assert registry.incref_blob("a.jpg") == 1, name
+            assert registry.blob_refs("b.jpg") == 1, name
+            registry.close()
+
+
+def test_identical_uploads_share_a_blob() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        for registry in _registries(tmp):
+            handler = _handler(tmp, registry)
+            data = _png("red")
+            first = _upload(handler, data, "car.png")
+            second = _upload(handler, data, "same car.PNG")
+            other = _upload(handler, _png("blue"), "other.png")
+
+            first_path = Path(registry.get(first).path)
+            assert first_path == Path(registry.get(second).path)
+            assert first_path != Path(registry.get(other).path)
+            assert registry.blob_refs(first_path.name) == 2
+
+            assert handler.cleanup_file(first)
+            assert not handler.cleanup_file(first)
+            assert first_path.exists() and registry.blob_refs(first_path.name) == 1
+            assert handler.cleanup_file(second)
+            assert not first_path.exists() and registry.blob_refs(first_path.name) == 0
+
+            handler.cleanup_files([other])
+            assert _stored_files(handler) == []
+            handler.shutdown()
+
+
+def test_remove_blob_rechecks_refcount() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        for registry in _registries(tmp):
+            handler = _handler(tmp, registry)
+            file_id = _upload(handler, _png("green"), "car.png")
+            blob_path = Path(registry.get(file_id).path)
+            registry.delete(file_id)
+            assert registry.decref_blob(blob_path.name) == 0
+
+            # An upload of the same bytes took a reference after the count
+            # hit zero: the blob is moved back instead of deleted.
+            registry.incref_blob(blob_path.name)
+            handler._remove_blob(blob_path)
+            assert _stored_files(handler) == [blob_path]
+
+            registry.decref_blob(blob_path.name)
+            handler._remove_blob(blob_path)
+            assert _stored_files(handler) == []
+            # Already gone: nothing to do.
+            handler._remove_blob(blob_path)
+            handler.shutdown()
+
+
+def main() -> None:
+    print("=== Content-Addressed Storage Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Blob reference counts", test_refcounts),
+        ("Identical uploads share a blob", test_identical_uploads_share_a_blob),
+        ("Delete re-checks references", test_remove_blob_rechecks_refcount),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] Blobs are shared by content and deleted with their last reference.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Combined Label Split Test
+Checks that `split_combined_label` splits the `{part}_{damage}` class names
+of the combined detector back into (part, damage_type), including parts and
+damage types that contain underscores themselves.
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_combined_labels.py
+"""
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.services.ml.model_loader import (  # noqa: E402
+    COMBINED_DAMAGE_TYPES,
+    _split_combined,
+    canonicalize_label,
+    split_combined_label,
+)
+
+PARTS = ["hood", "front_door", "rear_bumper", "left_rear_quarter_panel", "tail_light"]
+
+
+def test_every_part_and_damage_round_trips() -> None:
+    for part in PARTS:
+        for damage_type in COMBINED_DAMAGE_TYPES:
+            label = f"{part}_{damage_type}"
+            assert split_combined_label(label) == (part, damage_type), label
+
+
+def test_multi_word_damage_wins_over_shorter_suffix() -> None:
+    assert split_combined_label("rear_bumper_broken_part") == ("rear_bumper", "broken_part")
+    assert split_combined_label("front_door_missing_part") == ("front_door", "missing_part")
+    assert split_combined_label("hood_paint_chip") == ("hood", "paint_chip")
+    assert split_combined_label("fender_other_damage") == ("fender", "other_damage")
+
+
+def test_raw_class_names_after_canonicalization() -> None:
+    assert split_combined_label(canonicalize_label("Front Door-Paint Chip")) == ("front_door", "paint_chip")
+    assert split_combined_label(canonicalize_label("Tail Light Cracked")) == ("tail_light", "cracked")
+
+
+def test_unknown_and_bare_labels() -> None:
+    # Damage types outside the known list still split on the last underscore.
+    assert split_combined_label("hood_smashed") == ("hood", "smashed")
+    # A class without a damage suffix is reported as an intact part.
+    assert split_combined_label("hood") == ("hood", "intact")
+
+
+def test_predictions_are_annotated() -> None:
+    predictions = [
+        {"label": "rear_bumper_dent", "confidence": 0.7, "bbox": [0.0, 0.0, 1.0, 1.0]},
+        {"label": "front_door_broken_part", "confidence": 0.5, "bbox": [1.0, 1.0, 2.0, 2.0]},
+    ]
+    annotated = _split_combined(predictions)
+    assert [(pred["part"], pred["damage_type"]) for pred in annotated] == [
+        ("rear_bumper", "dent"),
+        ("front_door", "broken_part"),
+    ]
+
+
+def main() -> None:
+    print("=== Combined Label Split Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Every part/damage pair", test_every_part_and_damage_round_trips),
+        ("Multi-word damage types", test_multi_word_damage_wins_over_shorter_suffix),
+        ("Raw class names", test_raw_class_names_after_canonicalization),
+        ("Unknown and bare labels", test_unknown_and_bare_labels),
+        ("Prediction annotation", test_predictions_are_annotated),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] Combined class names split into part and damage type.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Damage Cascade Crop Test
+Checks that `_cascade_crops` pads, clamps and merges part boxes, sizes each
+crop's input to the full frame's pixel scale, falls back to the full frame
+for close-ups or when the crops would cost more than one full-frame pass,
+and that damage boxes found on the crops are shifted back into original
+image coordinates.
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_damage_cascade.py
+"""
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.core.config import settings  # noqa: E402
+from apps.api.services.ml import inference  # noqa: E402
+
+CASCADE_SETTINGS = {
+    "DAMAGE_CASCADE_ENABLED": True,
+    "DAMAGE_CASCADE_PADDING": 0.1,
+    "DAMAGE_CASCADE_MAX_AREA_RATIO": 0.6,
+    "DAMAGE_CASCADE_MAX_CROPS": 4,
+}
+
+
+def _part(bbox: List[float]) -> Dict:
+    return {"label": "hood", "confidence": 0.9, "bbox": bbox}
+
+
+def _with_cascade_settings(test):
+    def run() -> None:
+        previous = {name: getattr(settings, name) for name in CASCADE_SETTINGS}
+        for name, value in CASCADE_SETTINGS.items():
+            setattr(settings, name, value)
+        try:
+            test()
+        finally:
+            for name, value in previous.items():
+                setattr(settings, name, value)
+
+    run.__name__ = test.__name__
+    return run
+
+
+def _bright_region(source: np.ndarray) -> List[Dict]:
+    """Stand-in damage detector: one box around the non-zero pixels of the source."""
+    ys, xs = np.nonzero(source.max(axis=2))
+    if len(xs) == 0:
+        return []
+    return [{
+        "label": "dent",
+        "confidence": 0.8,
+        "bbox": [float(xs.min()), float(ys.min()), float(xs.max() + 1), float(ys.max() + 1)],
+    }]
+
+
+class _FakeDamageModel:
+    """Stand-in for Stage 2: records each predict call's input size and source shapes."""
+
+    def __init__(self):
+        self.calls: List[Tuple[int, List[Tuple[int, int]]]] = []
+
+    def detect(self, image: np.ndarray, imgsz: int) -> List[Dict]:
+        return self.detect_batch([image], imgsz)[0]
+
+    def detect_batch(self, images: List[np.ndarray], imgsz: int) -> List[List[Dict]]:
+        self.calls.append((imgsz, [image.shape[:2] for image in images]))
+        return [_bright_region(image) for image in images]
+
+    def run(self, images: List[np.ndarray], part_batches: List[List[Dict]], imgsz: int) -> List[List[Dict]]:
+        originals = inference.detect_damage, inference.detect_damage_batch
+        inference.detect_damage, inference.detect_damage_batch = self.detect, self.detect_batch
+        try:
+            return inference._detect_damage_stage(images, part_batches, imgsz=imgsz)
+        finally:
+            inference.detect_damage, inference.detect_damage_batch = originals
+
+
+@_with_cascade_settings
+def test_crops_are_padded_and_clamped() -> None:
+    crops = inference._cascade_crops([_part([10.0, 20.0, 110.0, 70.0])], height=400, width=600, imgsz=640)
+    assert crops == [((0, 15, 120, 75), 128)], crops
+
+    crops = inference._cascade_crops([_part([550.0, 350.0, 600.0, 400.0])], height=400, width=600, imgsz=640)
+    assert crops == [((545, 345, 600, 400), 64)], crops
+
+
+@_with_cascade_settings
+def test_overlapping_crops_merge() -> None:
+    parts = [_part([100.0, 100.0, 200.0, 150.0]), _part([190.0, 120.0, 260.0, 180.0])]
+    crops = inference._cascade_crops(parts, height=1000, width=1000, imgsz=640)
+    assert crops == [((90, 95, 267, 186), 128)], crops
+
+    parts.append(_part([700.0, 700.0, 760.0, 760.0]))
+    crops = inference._cascade_crops(parts, height=1000, width=1000, imgsz=640)
+    assert len(crops) == 2, crops
+
+
+@_with_cascade_settings
+def test_too_many_crops_collapse_to_one() -> None:
+    parts = [_part([x, 10.0, x + 20.0, 30.0]) for x in (0.0, 100.0, 200.0, 300.0, 400.0)]
+    crops = inference._cascade_crops(parts, height=1000, width=1000, imgsz=640)
+    assert crops == [((0, 8, 422, 32), 288)], crops
+
+
+@_with_cascade_settings
+def test_close_up_keeps_full_frame() -> None:
+    assert inference._cascade_crops([_part([0.0, 0.0, 90.0, 90.0])], height=100, width=100, imgsz=640) is None
+    assert inference._cascade_crops([], height=100, width=100, imgsz=640) is None
+
+
+@_with_cascade_settings
+def test_costly_crops_keep_full_frame() -> None:
+    # Two long, thin parts: little area, but each crop needs nearly the full input size.
+    parts = [_part([50.0, 100.0, 850.0, 140.0]), _part([50.0, 500.0, 850.0, 540.0])]
+    assert inference._cascade_crops(parts, height=1000, width=1000, imgsz=640) is None
+    assert inference._cascade_crops(parts[:1], height=1000, width=1000, imgsz=640) == [((0, 96, 930, 144), 608)]
+
+
+@_with_cascade_settings
+def test_damage_model_input_sizes() -> None:
+    images = [np.zeros((400, 600, 3), dtype=np.uint8) for _ in range(2)]
+    parts = [_part([20.0, 20.0, 80.0, 60.0]), _part([300.0, 200.0, 400.0, 260.0])]
+    model = _FakeDamageModel()
+    model.run(images, [parts, parts], imgsz=640)
+
+    # Crops keep the full frame's pixel scale; same-size crops share a call.
+    assert sorted(model.calls) == [
+        (96, [(48, 72), (48, 72)]),
+        (128, [(72, 120), (72, 120)]),
+    ], model.calls
+    # Never more work than running the two frames at 640.
+    assert sum(imgsz ** 2 * len(shapes) for imgsz, shapes in model.calls) < 2 * 640 ** 2
+
+
+@_with_cascade_settings
+def test_damage_boxes_map_back_to_image() -> None:
+    first = np.zeros((400, 600, 3), dtype=np.uint8)
+    first[210:230, 330:370] = 255  # damage inside the second part
+    second = np.zeros((300, 300, 3), dtype=np.uint8)
+    second[10:20, 10:20] = 255  # close-up: runs on the full frame
+    part_batches = [
+        [_part([20.0, 20.0, 80.0, 60.0]), _part([300.0, 200.0, 400.0, 260.0])],
+        [_part([0.0, 0.0, 290.0, 290.0])],
+    ]
+
+    model = _FakeDamageModel()
+    damage = model.run([first, second], part_batches, imgsz=640)
+
+    # Two crops of the first image at their own sizes, the full second image at 640.
+    assert sorted(model.calls) == [(96, [(48, 72)]), (128, [(72, 120)]), (640, [(300, 300)])], model.calls
+    assert [pred["bbox"] for pred in damage[0]] == [[330.0, 210.0, 370.0, 230.0]], damage[0]
+    assert [pred["bbox"] for pred in damage[1]] == [[10.0, 10.0, 20.0, 20.0]], damage[1]
+
+
+def main() -> None:
+    print("=== Damage Cascade Crop Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Padding and clamping", test_crops_are_padded_and_clamped),
+        ("Overlapping crops merge", test_overlapping_crops_merge),
+        ("Crop limit", test_too_many_crops_collapse_to_one),
+        ("Close-up fallback", test_close_up_keeps_full_frame),
+        ("Costly crops fallback", test_costly_crops_keep_full_frame),
+        ("Damage model input sizes", test_damage_model_input_sizes),
+        ("Boxes mapped back to the image", test_damage_boxes_map_back_to_image),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] Cascade crops cover the parts and map damage back to image coordinates.\n")
+
+
+if __name__ == "__main__":
+    main()
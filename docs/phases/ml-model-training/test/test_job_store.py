@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Job Store Test
+Checks the SQLite `JobStore` behind `/infer/jobs`: a job is claimed by one
+runner only, jobs left running by a dead or restarted process are requeued
+while those of live processes are kept, and results page in upload order
+without skipping or repeating any while the job is still running.
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_job_store.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.services.ml.jobs import (  # noqa: E402
+    COMPLETED,
+    QUEUED,
+    RUNNING,
+    JobStore,
+)
+
+
+def _store(tmp: str) -> JobStore:
+    return JobStore(Path(tmp) / "jobs.sqlite3")
+
+
+def _create(store: JobStore, count: int = 2) -> str:
+    file_ids = [f"file-{i}" for i in range(count)]
+    return store.create(file_ids, [f"/blobs/{file_id}.jpg" for file_id in file_ids], False, "standard")
+
+
+def _set_owner(store: JobStore, job_id: str, pid, token) -> None:
+    # Pretend the job was claimed by another process.
+    with store._conn:
+        store._conn.execute(
+            "UPDATE jobs SET owner_pid = ?, owner_token = ? WHERE id = ?", (pid, token, job_id)
+        )
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_claim_is_exclusive() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        store = _store(tmp)
+        job_id = _create(store)
+        assert store.get(job_id)["status"] == QUEUED
+        assert store.count_queued() == 1
+
+        assert store.claim(job_id)
+        assert not store.claim(job_id)
+        job = store.get(job_id)
+        assert job["status"] == RUNNING and job["owner_pid"] == os.getpid(), job
+        assert store.count_queued() == 0
+        assert not store.claim("no-such-job")
+
+
+def test_requeue_orphans() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        store = _store(tmp)
+        ours, restarted, dead, live = (_create(store) for _ in range(4))
+        for job_id in (ours, restarted, dead, live):
+            assert store.claim(job_id)
+        # Same PID, different boot token: the container restarted with the API as PID 1 again.
+        _set_owner(store, restarted, os.getpid(), "previous-boot")
+        _set_owner(store, dead, _dead_pid(), "other-process")
+        # Another live worker (e.g. a second uvicorn process) keeps its job.
+        _set_owner(store, live, os.getppid(), "other-worker")
+
+        queued = store.requeue_orphans()
+        assert sorted(queued) == sorted([restarted, dead]), queued
+        assert store.get(ours)["status"] == RUNNING
+        assert store.get(live)["status"] == RUNNING
+        requeued = store.get(restarted)
+        assert requeued["status"] == QUEUED and requeued["owner_token"] is None, requeued
+
+        # A requeued job can be claimed again and starts from scratch.
+        store.add_result(restarted, 0, {"position": 0}, filtered=1)
+        assert store.claim(restarted)
+        job = store.get(restarted)
+        assert job["completed"] == 0 and job["filtered_count"] == 0, job
+        assert store.results(restarted, 0, 10) == []
+
+
+def test_results_page_in_order() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        store = _store(tmp)
+        job_id = _create(store, count=5)
+        assert store.claim(job_id)
+        for position in (3, 0, 4, 1, 2):
+            store.add_result(job_id, position, {"position": position}, filtered=position % 2)
+
+        job = store.get(job_id)
+        assert job["completed"] == 5 and job["filtered_count"] == 2, job
+        assert [p for p, _ in store.results(job_id, 0, 2)] == [0, 1]
+        assert [p for p, _ in store.results(job_id, 2, 2)] == [2, 3]
+        assert [r["position"] for _, r in store.results(job_id, 4, 2)] == [4]
+        assert store.results(job_id, 5, 2) == []
+
+
+def test_polling_a_running_job_sees_every_result_once() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        store = _store(tmp)
+        job_id = _create(store, count=6)
+        assert store.claim(job_id)
+
+        seen = []
+        cursor = 0
+        # Results land out of order between polls (e.g. cache hits first).
+        for arrived in ((2, 5), (0,), (3,), (1, 4)):
+            for position in arrived:
+                store.add_result(job_id, position, {"position": position}, filtered=0)
+            page = store.results(job_id, cursor, 2, contiguous=True)
+            seen.extend(result["position"] for _, result in page)
+            cursor = page[-1][0] + 1 if page else cursor
+        while True:
+            page = store.results(job_id, cursor, 2, contiguous=True)
+            if not page:
+                break
+            seen.extend(result["position"] for _, result in page)
+            cursor = page[-1][0] + 1
+        assert seen == [0, 1, 2, 3, 4, 5], seen
+
+        # Without contiguous (finished jobs) gaps are skipped, not waited for.
+        other = _create(store, count=4)
+        for position in (0, 2, 3):
+            store.add_result(other, position, {"position": position}, filtered=0)
+        assert [p for p, _ in store.results(other, 0, 10, contiguous=True)] == [0]
+        assert [p for p, _ in store.results(other, 0, 10)] == [0, 2, 3]
+
+
+def test_active_paths_and_purge() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        store = _store(tmp)
+        queued, running, finished = (_create(store, count=1) for _ in range(3))
+        assert store.claim(running)
+        assert store.claim(finished)
+        store.finish(finished)
+        assert store.get(finished)["status"] == COMPLETED
+
+        paths = {path for job_id in (queued, running) for path in store.get(job_id)["file_paths"]}
+        assert store.active_file_paths() == paths
+
+        assert store.purge_expired(ttl_seconds=3600) == 0
+        time.sleep(0.01)
+        assert store.purge_expired(ttl_seconds=0) == 1
+        assert store.get(finished) is None
+        assert store.get(queued) is not None
+
+
+def main() -> None:
+    print("=== Job Store Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Exclusive claim", test_claim_is_exclusive),
+        ("Orphaned job requeue", test_requeue_orphans),
+        ("Result pagination", test_results_page_in_order),
+        ("Polling a running job", test_polling_a_running_job_sees_every_result_once),
+        ("Active paths and purge", test_active_paths_and_purge),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] Jobs are claimed once, recovered after restarts and paged in order.\n")
+
+
+if __name__ == "__main__":
+    main()
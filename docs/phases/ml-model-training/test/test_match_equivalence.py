@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Damage-to-Part Matching Equivalence Test
+Checks the vectorized `_match_damage_to_parts` against the original
+pure-Python nested-loop matcher on randomized part/damage predictions.
+
+Runs offline (no backend needed) from the project root:
+    python docs/phases/ml-model-training/test/test_match_equivalence.py
+"""
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.models.detection import Detection  # noqa: E402
+from apps.api.services.ml.inference import _match_damage_to_parts  # noqa: E402
+from apps.api.services.ml.model_loader import canonicalize_label as _canonicalize  # noqa: E402
+
+SEED = 1234
+NUM_CASES = 3000
+PART_LABELS = ["front_door", "Rear Bumper", "hood", "fender-left", "windshield"]
+DAMAGE_LABELS = ["dent", "Scratch", "intact", "paint-chip", "missing_part", "cracked", ""]
+IOU_THRESHOLDS = [0.0, 0.1, 0.3, 0.5]
+
+
+def _reference_iou(box_a: List[float], box_b: List[float]) -> float:
+    ax1, ay1, ax2, ay2 = box_a
+    bx1, by1, bx2, by2 = box_b
+
+    ix1 = max(ax1, bx1)
+    iy1 = max(ay1, by1)
+    ix2 = min(ax2, bx2)
+    iy2 = min(ay2, by2)
+
+    inter_w = max(0.0, ix2 - ix1)
+    inter_h = max(0.0, iy2 - iy1)
+    inter_area = inter_w * inter_h
+    if inter_area <= 0:
+        return 0.0
+
+    area_a = max(0.0, ax2 - ax1) * max(0.0, ay2 - ay1)
+    area_b = max(0.0, bx2 - bx1) * max(0.0, by2 - by1)
+    union = area_a + area_b - inter_area
+    if union <= 0:
+        return 0.0
+    return inter_area / union
+
+
+def _reference_match(parts: List[Dict], damages: List[Dict], iou_threshold: float) -> List[Detection]:
+    """Original nested-loop matcher, kept verbatim as the oracle."""
+    assignments: Dict[int, Dict[str, Optional[float]]] = {}
+    for idx, part in enumerate(parts):
+        assignments[idx] = {
+            "damage_type": "intact",
+            "confidence": part["confidence"],
+        }
+
+    for damage in damages:
+        damage_label = _canonicalize(damage["label"])
+        if damage_label == "intact":
+            continue
+
+        best_idx: Optional[int] = None
+        best_iou = 0.0
+        for idx, part in enumerate(parts):
+            iou = _reference_iou(part["bbox"], damage["bbox"])
+            if iou > best_iou:
+                best_iou = iou
+                best_idx = idx
+
+        if best_idx is not None and best_iou >= iou_threshold:
+            current_conf = assignments[best_idx]["confidence"] or 0.0
+            if damage["confidence"] > current_conf:
+                assignments[best_idx] = {
+                    "damage_type": damage_label,
+                    "confidence": damage["confidence"],
+                }
+
+    detections: List[Detection] = []
+    for idx, part in enumerate(parts):
+        assigned = assignments.get(idx, {"damage_type": "intact", "confidence": part["confidence"]})
+        damage_type = assigned["damage_type"] or "intact"
+        damage_conf = assigned["confidence"] or part["confidence"]
+        final_conf = min(part["confidence"], damage_conf)
+        detections.append(
+            Detection(
+                part=_canonicalize(part["label"]),
+                damage_type=damage_type,
+                confidence=final_conf,
+                bbox=part["bbox"],
+                severity=None,
+            )
+        )
+    return detections
+
+
+def _random_box(rng: random.Random) -> List[float]:
+    # Boxes cluster around a few anchors so many pairs overlap; a few are
+    # degenerate (zero/negative size) to exercise the edge cases.
+    cx = rng.choice([100.0, 140.0, 400.0]) + rng.uniform(-60, 60)
+    cy = rng.choice([100.0, 160.0, 300.0]) + rng.uniform(-60, 60)
+    w = rng.choice([0.0, -5.0]) if rng.random() < 0.05 else rng.uniform(5, 200)
+    h = rng.uniform(5, 200)
+    if rng.random() < 0.1:
+        # Integer coordinates produce exact IoU ties between parts.
+        return [float(round(cx)), float(round(cy)), float(round(cx + w)), float(round(cy + h))]
+    return [cx, cy, cx + w, cy + h]
+
+
+def _random_prediction(rng: random.Random, labels: List[str]) -> Dict:
+    # Coarse confidences make ties between damages and parts common.
+    return {
+        "label": rng.choice(labels),
+        "confidence": rng.choice([0.0, 0.25, 0.5, 0.5, 0.75, 0.9, round(rng.random(), 3)]),
+        "bbox": _random_box(rng),
+    }
+
+
+def _canonical(predictions: List[Dict]) -> List[Dict]:
+    # model_loader hands the matcher labels that are already canonical.
+    return [dict(pred, label=_canonicalize(pred["label"])) for pred in predictions]
+
+
+def test_vectorized_matches_reference() -> None:
+    rng = random.Random(SEED)
+    for case in range(NUM_CASES):
+        parts = [_random_prediction(rng, PART_LABELS) for _ in range(rng.randint(0, 8))]
+        damages = [_random_prediction(rng, DAMAGE_LABELS) for _ in range(rng.randint(0, 12))]
+        threshold = rng.choice(IOU_THRESHOLDS)
+
+        expected = [d.model_dump() for d in _reference_match(parts, damages, threshold)]
+        actual = [
+            d.model_dump()
+            for d in _match_damage_to_parts(_canonical(parts), _canonical(damages), threshold)
+        ]
+        assert actual == expected, f"case {case} diverged (threshold={threshold})"
+
+
+def test_empty_inputs() -> None:
+    part = {"label": "hood", "confidence": 0.6, "bbox": [0.0, 0.0, 10.0, 10.0]}
+    assert _match_damage_to_parts([], [], 0.1) == []
+    assert _match_damage_to_parts([], [part], 0.1) == []
+    only_part = _match_damage_to_parts([part], [], 0.1)
+    assert [d.damage_type for d in only_part] == ["intact"]
+
+
+def main() -> None:
+    print("=== Damage Matching Equivalence Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Randomized equivalence", test_vectorized_matches_reference),
+        ("Empty inputs", test_empty_inputs),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print(f"\n[PASS] Vectorized matcher agrees with the reference on {NUM_CASES} random cases.\n")
+
+
+if __name__ == "__main__":
+    main()
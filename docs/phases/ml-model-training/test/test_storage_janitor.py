@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Storage Janitor Test
+Runs `StorageJanitor.sweep` on a temp directory with a controlled clock:
+idle uploads expire after the TTL, the least recently used uploads are
+evicted to fit the byte quota, stale unreferenced files are deleted, and
+uploads of queued or running jobs are never touched.
+
+Runs offline (no backend or weights needed) from the project root:
+    python docs/phases/ml-model-training/test/test_storage_janitor.py
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Set
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+PROJECT_ROOT = Path(__file__).resolve().parents[4]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from apps.api.utils.file_handler import FileHandler  # noqa: E402
+from apps.api.utils.file_registry import MemoryFileRegistry  # noqa: E402
+from apps.api.utils.storage_janitor import StorageJanitor, _stored_size  # noqa: E402
+
+HOUR = 3600.0
+
+
+def _handler(tmp: str) -> FileHandler:
+    handler = FileHandler()
+    handler.temp_dir = Path(tmp) / "temp"
+    handler.blob_dir = handler.temp_dir / "blobs"
+    handler.registry = MemoryFileRegistry()
+    return handler
+
+
+def _janitor(
+    handler: FileHandler, ttl: float = 0, quota: int = 0, protected: Set[str] = frozenset()
+) -> StorageJanitor:
+    return StorageJanitor(
+        handler,
+        ttl_seconds=ttl,
+        quota_bytes=quota,
+        interval_seconds=60,
+        active_paths=lambda: set(protected),
+    )
+
+
+def _upload(handler: FileHandler, color: str) -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="PNG")
+    buffer.seek(0)
+    return asyncio.run(handler.save_file(UploadFile(buffer, filename=f"{color}.png")))
+
+
+def _uploads(handler: FileHandler, colors: List[str], last_used: List[float]) -> List[str]:
+    file_ids = [_upload(handler, color) for color in colors]
+    for file_id, at in zip(file_ids, last_used):
+        handler.registry.touch([file_id], at)
+    return file_ids
+
+
+def _path(handler: FileHandler, file_id: str) -> str:
+    return handler.registry.get(file_id).path
+
+
+def test_ttl_expires_idle_uploads() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        handler = _handler(tmp)
+        now = time.time()
+        idle, recent, queued = _uploads(
+            handler, ["red", "green", "blue"], [now - 3 * HOUR, now - 60, now - 3 * HOUR]
+        )
+        idle_path = Path(_path(handler, idle))
+        janitor = _janitor(handler, ttl=2 * HOUR, protected={_path(handler, queued)})
+
+        stats = janitor.sweep(now=now)
+        assert stats["ttl"] == 1 and stats["freed_bytes"] > 0, stats
+        assert handler.registry.get(idle) is None and not idle_path.exists()
+        assert handler.files_exist([recent, queued]) == [True, True]
+
+        # Using the file again resets its idle time.
+        handler.touch_files([recent])
+        assert janitor.sweep(now=now + 2 * HOUR)["ttl"] == 0
+        assert handler.files_exist([recent, queued]) == [True, True]
+        handler.shutdown()
+
+
+def test_quota_evicts_least_recently_used() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        handler = _handler(tmp)
+        now = time.time()
+        colors = ["red", "green", "blue", "white"]
+        file_ids = _uploads(handler, colors, [now - 4 * HOUR, now - 3 * HOUR, now - 2 * HOUR, now - HOUR])
+        oldest, second, third, newest = file_ids
+        sizes = {file_id: _stored_size(Path(_path(handler, file_id))) for file_id in file_ids}
+        total = sum(sizes.values())
+
+        # The oldest upload belongs to a queued job, so the next two go instead.
+        quota = total - sizes[second] - sizes[third] // 2
+        janitor = _janitor(handler, quota=quota, protected={_path(handler, oldest)})
+        stats = janitor.sweep(now=now)
+        assert stats["quota"] == 2 and stats["freed_bytes"] == sizes[second] + sizes[third], stats
+        assert handler.files_exist(file_ids) == [True, False, False, True]
+
+        # Under quota now: nothing else is evicted.
+        assert janitor.sweep(now=now)["quota"] == 0
+        assert handler.files_exist([oldest, newest]) == [True, True]
+        handler.shutdown()
+
+
+def test_quota_spares_files_in_use() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        handler = _handler(tmp)
+        now = time.time()
+        # Used within the last sweep interval: likely being inferred right now.
+        file_ids = _uploads(handler, ["red", "green"], [now - 10, now - 5])
+        stats = _janitor(handler, quota=1).sweep(now=now)
+        assert stats["quota"] == 0, stats
+        assert handler.files_exist(file_ids) == [True, True]
+        handler.shutdown()
+
+
+def test_orphans_are_removed_after_grace_period() -> None:
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as tmp:
+        handler = _handler(tmp)
+        now = time.time()
+        (kept,) = _uploads(handler, ["red"], [now])
+        (lost,) = _uploads(handler, ["green"], [now])
+        (queued,) = _uploads(handler, ["blue"], [now])
+        kept_path, lost_path, queued_path = (Path(_path(handler, f)) for f in (kept, lost, queued))
+
+        # Registry entries lost (e.g. memory backend restart), but the job store still lists one.
+        handler.registry.delete(lost)
+        handler.registry.delete(queued)
+        handler.registry.decref_blob(lost_path.name)
+        handler.registry.decref_blob(queued_path.name)
+        stale_part = handler.temp_dir / "interrupted.png.part"
+        fresh_part = handler.temp_dir / "uploading.png.part"
+        stale_part.write_bytes(b"x" * 10)
+        fresh_part.write_bytes(b"x" * 10)
+        old = now - 2 * HOUR
+        for path in (kept_path, lost_path, queued_path, stale_part):
+            os.utime(path, (old, old))
+
+        stats = _janitor(handler, protected={str(queued_path)}).sweep(now=now)
+        assert stats["orphan"] == 2, stats
+        assert not lost_path.exists() and not stale_part.exists()
+        assert kept_path.exists() and queued_path.exists() and fresh_part.exists()
+
+        # A blob re-referenced by another process after the scan is kept.
+        handler.registry.incref_blob(queued_path.name)
+        stats = _janitor(handler).sweep(now=now)
+        assert stats["orphan"] == 0 and queued_path.exists(), stats
+        handler.shutdown()
+
+
+def main() -> None:
+    print("=== Storage Janitor Tests ===\n")
+    failed = False
+    for name, test in (
+        ("Idle-upload TTL", test_ttl_expires_idle_uploads),
+        ("Quota LRU eviction", test_quota_evicts_least_recently_used),
+        ("Quota spares in-flight files", test_quota_spares_files_in_use),
+        ("Orphaned files", test_orphans_are_removed_after_grace_period),
+    ):
+        try:
+            test()
+            print(f"  [PASS] {name}")
+        except AssertionError as exc:
+            failed = True
+            print(f"  [FAIL] {name}: {exc}")
+    if failed:
+        sys.exit(1)
+    print("\n[PASS] The janitor frees expired, over-quota and orphaned files and keeps job inputs.\n")
+
+
+if __name__ == "__main__":
+    main()
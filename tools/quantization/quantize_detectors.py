@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Builds INT8 OpenVINO variants of the Stage 1 (part) and Stage 2 (damage)
+detectors for CPU serving, calibrated on the `images/val` split written by
+`tools/label_fusion/build_damage_dataset.py`, and reports the accuracy and
+latency change against the fp32 weights.
+
+The exported `<stem>_int8_openvino_model/` directories can be used directly
+as `PART_MODEL_PATH` / `DAMAGE_MODEL_PATH`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+from ultralytics import YOLO
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Quantize the part and damage detectors to INT8 (OpenVINO) for CPU serving."
+    )
+    parser.add_argument(
+        "--calib-data",
+        required=True,
+        type=Path,
+        help="data.yaml produced by build_damage_dataset.py; its val split is the calibration set.",
+    )
+    parser.add_argument(
+        "--part-model",
+        type=Path,
+        default=Path("models/yolov8n_part_detector.pt"),
+        help="fp32 Stage 1 part detector weights.",
+    )
+    parser.add_argument(
+        "--damage-model",
+        type=Path,
+        default=Path("models/yolov8n_damage.pt"),
+        help="fp32 Stage 2 damage detector weights.",
+    )
+    parser.add_argument(
+        "--part-eval-data",
+        type=Path,
+        default=None,
+        help="Optional data.yaml with part labels for the part detector accuracy delta.",
+    )
+    parser.add_argument(
+        "--damage-eval-data",
+        type=Path,
+        default=None,
+        help="data.yaml used for the damage detector accuracy delta (defaults to --calib-data).",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("models/int8"),
+        help="Directory where the INT8 models and the report are written.",
+    )
+    parser.add_argument(
+        "--only",
+        choices=("part", "damage"),
+        default=None,
+        help="Quantize only one of the two detectors.",
+    )
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=640,
+        help="Inference resolution used for export, validation and timing.",
+    )
+    parser.add_argument(
+        "--calib-fraction",
+        type=float,
+        default=1.0,
+        help="Fraction of the calibration split to use (lower for quicker runs).",
+    )
+    parser.add_argument(
+        "--latency-images",
+        type=int,
+        default=50,
+        help="Number of val images timed for the latency comparison.",
+    )
+    return parser.parse_args()
+
+
+def resolve_val_images(data_yaml: Path) -> List[Path]:
+    data = yaml.safe_load(data_yaml.read_text())
+    root = Path(data.get("path") or data_yaml.parent)
+    val_dir = root / data.get("val", "images/val")
+    images = sorted(p for p in val_dir.glob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not images:
+        raise RuntimeError(f"No calibration images found in {val_dir}")
+    return images
+
+
+def export_int8(weights: Path, calib_data: Path, output_dir: Path, imgsz: int, fraction: float) -> Path:
+    """Export an INT8 OpenVINO model into output_dir and return its directory."""
+    target = output_dir / f"{weights.stem}_int8_openvino_model"
+    # Ultralytics writes the export next to the weights; export from a copy so
+    # nothing lands beside the source model.
+    staging_dir = output_dir / f".{weights.stem}-staging"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir(parents=True)
+    try:
+        staged_weights = staging_dir / weights.name
+        shutil.copy2(weights, staged_weights)
+        exported = YOLO(str(staged_weights)).export(
+            format="openvino",
+            int8=True,
+            data=str(calib_data),
+            fraction=fraction,
+            imgsz=imgsz,
+            device="cpu",
+        )
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.move(str(exported), str(target))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return target
+
+
+def measure_latency(model: YOLO, images: List[Path], imgsz: int, warmup: int = 3) -> Dict[str, float]:
+    for img in images[:warmup]:
+        model.predict(source=str(img), imgsz=imgsz, device="cpu", verbose=False)
+    timings = []
+    for img in images:
+        start = time.perf_counter()
+        model.predict(source=str(img), imgsz=imgsz, device="cpu", verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def measure_accuracy(model: YOLO, data_yaml: Path, imgsz: int) -> Dict[str, float]:
+    metrics = model.val(data=str(data_yaml), split="val", imgsz=imgsz, batch=1, device="cpu", plots=False, verbose=False)
+    return {
+        "map50": float(metrics.box.map50),
+        "map50_95": float(metrics.box.map),
+    }
+
+
+def quantize_detector(
+    name: str,
+    weights: Path,
+    calib_data: Path,
+    eval_data: Optional[Path],
+    output_dir: Path,
+    imgsz: int,
+    fraction: float,
+    latency_images: List[Path],
+) -> Dict:
+    if not weights.exists():
+        raise FileNotFoundError(f"{name} weights not found: {weights}")
+
+    print(f"[{name}] Exporting INT8 OpenVINO model from {weights}...")
+    int8_dir = export_int8(weights, calib_data, output_dir, imgsz, fraction)
+    fp32_model = YOLO(str(weights))
+    int8_model = YOLO(str(int8_dir), task="detect")
+
+    print(f"[{name}] Timing fp32 vs int8 on {len(latency_images)} images...")
+    fp32_latency = measure_latency(fp32_model, latency_images, imgsz)
+    int8_latency = measure_latency(int8_model, latency_images, imgsz)
+    report: Dict = {
+        "fp32_weights": str(weights),
+        "int8_model": str(int8_dir),
+        "latency": {
+            "fp32": fp32_latency,
+            "int8": int8_latency,
+            "speedup": fp32_latency["mean_ms"] / int8_latency["mean_ms"],
+        },
+    }
+
+    if eval_data is not None:
+        print(f"[{name}] Validating fp32 vs int8 on {eval_data}...")
+        fp32_acc = measure_accuracy(fp32_model, eval_data, imgsz)
+        int8_acc = measure_accuracy(int8_model, eval_data, imgsz)
+        report["accuracy"] = {
+            "fp32": fp32_acc,
+            "int8": int8_acc,
+            "delta": {key: int8_acc[key] - fp32_acc[key] for key in fp32_acc},
+        }
+    else:
+        print(f"[{name}] No eval data given; skipping accuracy comparison.")
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    val_images = resolve_val_images(args.calib_data)
+    latency_images = val_images[: args.latency_images]
+
+    targets = {
+        "part": (args.part_model, args.part_eval_data),
+        "damage": (args.damage_model, args.damage_eval_data or args.calib_data),
+    }
+    reports = {}
+    for name, (weights, eval_data) in targets.items():
+        if args.only and args.only != name:
+            continue
+        reports[name] = quantize_detector(
+            name=name,
+            weights=weights,
+            calib_data=args.calib_data,
+            eval_data=eval_data,
+            output_dir=args.output_dir,
+            imgsz=args.imgsz,
+            fraction=args.calib_fraction,
+            latency_images=latency_images,
+        )
+
+    report_path = args.output_dir / "quantization_report.json"
+    report_path.write_text(json.dumps(reports, indent=2))
+    print(json.dumps(reports, indent=2))
+    print(f"\nReport written to {report_path}")
+    for name, report in reports.items():
+        env_key = "PART_MODEL_PATH" if name == "part" else "DAMAGE_MODEL_PATH"
+        print(f"  {env_key}={report['int8_model']}")
+
+
+if __name__ == "__main__":
+    main()